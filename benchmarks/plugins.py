@@ -0,0 +1,118 @@
+"""Fake AI client and DB plugins with configurable latency, no network involved."""
+
+import asyncio
+import os
+import re
+import threading
+import time
+
+from fastapi_llm_test_generator.llm.prompt import group_marker_template
+from fastapi_llm_test_generator.plugins import ai_clients_registry, db_clients_registry
+from fastapi_llm_test_generator.plugins.db_clients.base import BaseDBPlugin
+from fastapi_llm_test_generator.schemas import CodeResponse
+
+# defaults for plugins created through the registries, e.g. from the CLI
+LLM_LATENCY = float(os.environ.get("BENCHMARK_LLM_LATENCY", 0))
+DB_LATENCY = float(os.environ.get("BENCHMARK_DB_LATENCY", 0))
+
+TEST_CODE = '''from fastapi.testclient import TestClient
+
+
+def test_route():
+    assert True
+'''
+
+GROUP_MARKER = re.compile(
+    "^"
+    + re.escape(group_marker_template).replace(re.escape("{index}"), r"(\d+)")
+    + "$",
+    re.MULTILINE,
+)
+
+
+class FakeAIClient:
+    isAsync = False
+
+    def __init__(self, latency: float = LLM_LATENCY, model: str = "fake"):
+        self.latency = latency
+        self.model = model
+        self.calls = 0
+        # called from the worker threads of --concurrency
+        self.lock = threading.Lock()
+
+    def response(self, prompt: str) -> CodeResponse:
+        with self.lock:
+            self.calls += 1
+        # one marked module per route of a grouped prompt, as split_group_response reads
+        indexes = sorted({int(index) for index in GROUP_MARKER.findall(prompt)})
+        content = "".join(
+            f"{group_marker_template.format(index=index)}\n{TEST_CODE}\n"
+            for index in indexes
+        )
+        content = content or TEST_CODE
+        return CodeResponse(content=content, tokens_used=len(content) // 4)
+
+    def __call__(
+        self, prompt: str, max_tokens: int = 2048, temperature: int = 0
+    ) -> CodeResponse:
+        time.sleep(self.latency)
+        return self.response(prompt)
+
+
+class AsyncFakeAIClient(FakeAIClient):
+    isAsync = True
+
+    async def __call__(
+        self, prompt: str, max_tokens: int = 2048, temperature: int = 0
+    ) -> CodeResponse:
+        await asyncio.sleep(self.latency)
+        return self.response(prompt)
+
+
+class FakeDBPlugin(BaseDBPlugin):
+    """Answers every table with a fixed definition after `latency` seconds."""
+
+    def __init__(self, db_url: str = "fake://", latency: float = DB_LATENCY):
+        super().__init__(db_url)
+        self.latency = latency
+        self.queries = 0
+        self.lock = threading.RLock()
+
+    def get_tables_definitions(self, table_names: list[str]) -> dict[str, tuple]:
+        with self.lock:
+            missing = self.missing_tables(table_names)
+            if missing:
+                time.sleep(self.latency)
+                self.queries += 1
+                columns = [
+                    (table, name, "integer", "NO", None)
+                    for table in missing
+                    for name in ("id", "name")
+                ]
+                self.cache_table_definitions(
+                    missing, columns, [], [], key=lambda row: (row[0], row[1:])
+                )
+            return self.cached_table_definitions(table_names)
+
+    def generate_markdown(self, table_name, columns, constraints, indexes):
+        markdown_output = f"# Table: `{table_name}`\n\n"
+        markdown_output += "| Column | Type | Nullable | Default |\n"
+        markdown_output += "|--------|------|----------|---------|\n"
+        for col in columns:
+            markdown_output += f"| {' | '.join(map(str, col))} |\n"
+        return markdown_output
+
+
+@ai_clients_registry.register("benchmark_fake")
+def register_fake_ai_client(api_key: str = None, model: str = None):
+    return FakeAIClient(model=model or "fake")
+
+
+@ai_clients_registry.register("benchmark_fake_async")
+def register_async_fake_ai_client(api_key: str = None, model: str = None):
+    return AsyncFakeAIClient(model=model or "fake")
+
+
+@db_clients_registry.register("benchmark_fake")
+def register_fake_db_plugin(db_url: str = "fake://"):
+    return FakeDBPlugin(db_url)
@@ -0,0 +1,190 @@
+"""Time the generator's own overhead on synthetic apps.
+
+    python -m benchmarks.run --sizes 10,100,1000,5000 --output report.json
+"""
+
+import json
+import logging
+import platform
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Union
+
+import typer
+from fastapi.routing import APIRoute
+from typing_extensions import Annotated
+
+from fastapi_llm_test_generator import FastAPILLMTestGenerator
+from fastapi_llm_test_generator.plugins.db_clients import use_db_plugin
+from fastapi_llm_test_generator.walk_ast.fastapi_functions import (
+    find_fastapi_app,
+    load_fastapi_module,
+)
+from fastapi_llm_test_generator.walk_ast.static import ProjectIndex
+from fastapi_llm_test_generator.walk_ast.store import ContextStore
+from fastapi_llm_test_generator.walk_ast.walker import (
+    CallGraph,
+    build_prompt,
+    inspect_fastapi_route,
+)
+
+from .plugins import AsyncFakeAIClient, FakeAIClient, FakeDBPlugin
+from .synthetic import write_synthetic_app
+
+logger = logging.getLogger(__name__)
+
+app = typer.Typer(name="benchmarks", help="Benchmark the test generator itself")
+
+
+@contextmanager
+def timed(timings: dict, stage: str):
+    start = time.perf_counter()
+    yield
+    timings[stage] = round(time.perf_counter() - start, 6)
+
+
+def benchmark_size(
+    directory: Path,
+    routes: int,
+    llm_latency: float = 0.0,
+    db_latency: float = 0.0,
+    concurrency: int = 8,
+    use_async: bool = False,
+    end_to_end: bool = True,
+) -> dict:
+    app_directory = write_synthetic_app(directory / f"bench_app_{routes}", routes)
+    sys.path.insert(0, str(app_directory))
+    timings = {}
+
+    with timed(timings, "discovery"):
+        app_file_path, _, app_instance = find_fastapi_app(app_directory)
+
+    with timed(timings, "static_discovery"):
+        index = ProjectIndex(app_directory)
+        index.routes(app_file_path, None, app_instance)
+
+    with timed(timings, "module_load"):
+        module, spec = load_fastapi_module(app_file_path)
+        spec.loader.exec_module(module)
+        fastapi_app = getattr(module, app_instance)
+    app_routes = [r for r in fastapi_app.routes if isinstance(r, APIRoute)]
+
+    call_graph = CallGraph()
+    with timed(timings, "walk"):
+        walkers = [inspect_fastapi_route(route, call_graph) for route in app_routes]
+
+    db_plugin = FakeDBPlugin(latency=db_latency)
+    with timed(timings, "db"):
+        walkers = [use_db_plugin(db_plugin, res) for res in walkers]
+
+    # sources are memoized per run, as in walker()
+    store = ContextStore()
+    with timed(timings, "prompt"):
+        prompts = [
+            build_prompt(route, res, call_graph, prompt_type="pytest", store=store)
+            for route, res in zip(app_routes, walkers)
+        ]
+
+    result = {
+        "routes": len(app_routes),
+        "timings": timings,
+        "prompt_characters": sum(len(prompt) for prompt in prompts),
+        "db_queries": db_plugin.queries,
+    }
+
+    if end_to_end:
+        client_class = AsyncFakeAIClient if use_async else FakeAIClient
+        ai_client = client_class(latency=llm_latency)
+        with tempfile.TemporaryDirectory() as test_directory:
+            with timed(timings, "end_to_end"):
+                FastAPILLMTestGenerator(
+                    app_directory,
+                    ai_client,
+                    Path(test_directory),
+                    db_plugin_instance=FakeDBPlugin(latency=db_latency),
+                    overwrite=True,
+                    concurrency=concurrency,
+                    app_reference=f"main:{app_instance}",
+                )()
+        result["llm_calls"] = ai_client.calls
+        result["routes_per_second"] = round(
+            len(app_routes) / max(timings["end_to_end"], 1e-9), 2
+        )
+
+    result["per_route"] = {
+        stage: round(seconds / max(len(app_routes), 1), 6)
+        for stage, seconds in timings.items()
+    }
+    sys.path.remove(str(app_directory))
+    return result
+
+
+@app.command()
+def run(
+    sizes: Annotated[
+        str, typer.Option(help="Comma separated numbers of routes to benchmark")
+    ] = "10,100,1000,5000",
+    llm_latency: Annotated[
+        float, typer.Option(help="Seconds the fake LLM takes per request")
+    ] = 0.0,
+    db_latency: Annotated[
+        float, typer.Option(help="Seconds the fake database takes per query")
+    ] = 0.0,
+    concurrency: Annotated[
+        int, typer.Option(help="Routes generated in parallel end-to-end")
+    ] = 8,
+    use_async: Annotated[
+        bool, typer.Option("--async", help="Use the async fake AI client")
+    ] = False,
+    end_to_end: Annotated[
+        bool, typer.Option(help="Also run the full generator on every app")
+    ] = True,
+    output: Annotated[
+        Union[Path, None], typer.Option(help="Write the JSON report to this file")
+    ] = None,
+):
+    logging.basicConfig(level=logging.WARNING)
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {
+            "llm_latency": llm_latency,
+            "db_latency": db_latency,
+            "concurrency": concurrency,
+            "async": use_async,
+        },
+        "results": [],
+    }
+
+    with tempfile.TemporaryDirectory() as directory:
+        for size in (int(s) for s in sizes.split(",") if s):
+            result = benchmark_size(
+                Path(directory),
+                size,
+                llm_latency=llm_latency,
+                db_latency=db_latency,
+                concurrency=concurrency,
+                use_async=use_async,
+                end_to_end=end_to_end,
+            )
+            report["results"].append(result)
+            typer.echo(
+                f"{size:>6} routes: "
+                + ", ".join(f"{k}={v:.3f}s" for k, v in result["timings"].items())
+            )
+
+    report_json = json.dumps(report, indent=2)
+    if output:
+        output.write_text(report_json)
+        typer.echo(f"Report written to {output}")
+    else:
+        typer.echo(report_json)
+
+
+if __name__ == "__main__":
+    app()
@@ -0,0 +1,98 @@
+"""Synthetic FastAPI apps of a given size, for benchmarking the generator."""
+
+from pathlib import Path
+from typing import Union
+
+TABLES = 20
+
+
+def models_module(models: int) -> str:
+    lines = ["from typing import Optional", "", "from pydantic import BaseModel", ""]
+    for k in range(models):
+        lines += ["", f"class Model{k}(BaseModel):", "    id: int", "    name: str"]
+        if k:
+            # nested models, so pydantic model discovery has something to follow
+            lines.append(f"    parent: Optional[Model{k - 1}] = None")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def services_module(helpers: int, depth: int) -> str:
+    lines = []
+    for k in range(helpers):
+        lines += ["", "", f"def helper_{k}(payload):"]
+        lines.append(f'    query = "SELECT id, name FROM table_{k % TABLES} WHERE id = %s"')
+        # helpers form chains of `depth` calls
+        if (k + 1) % depth:
+            lines.append(f"    return helper_{k + 1}({{'query': query, **payload}})")
+        else:
+            lines.append("    return {'query': query, **payload}")
+    return "\n".join(lines).lstrip() + "\n"
+
+
+def router_module(package: str, routes: range, models: int, depth: int, chains: int):
+    lines = [
+        "from fastapi import APIRouter",
+        "",
+        f"from {package} import models, services",
+        "",
+        "router = APIRouter()",
+    ]
+    for i in routes:
+        lines += [
+            "",
+            "",
+            f'@router.post("/resource_{i}", response_model=models.Model{(i + 1) % models})',
+            f"def endpoint_{i}(payload: models.Model{i % models}):",
+            # routes share helper chains, like real apps share services
+            f"    data = services.helper_{(i % chains) * depth}({{'id': payload.id}})",
+            "    return {'id': payload.id, 'name': str(data)}",
+        ]
+    return "\n".join(lines) + "\n"
+
+
+def write_synthetic_app(
+    directory: Union[str, Path],
+    routes: int,
+    routers: int = None,
+    depth: int = 3,
+    models: int = None,
+) -> Path:
+    """Write an app with `routes` routes spread over `routers` routers.
+
+    Every endpoint validates a pydantic model and calls into one of
+    routes // 2 chains of `depth` helpers that run SQL. Returns the app
+    directory, the app lives in its main.py, everything else in a package
+    named after the directory, so apps of different sizes can be imported in
+    one process.
+    """
+    directory = Path(directory)
+    package = directory.name
+    routers = routers or max(1, routes // 50)
+    models = models or max(2, routes // 10)
+    chains = max(1, routes // 2)
+    per_router = -(-routes // routers)
+
+    package_directory = directory / package
+    (package_directory / "routers").mkdir(parents=True, exist_ok=True)
+    (package_directory / "__init__.py").write_text("")
+    (package_directory / "routers" / "__init__.py").write_text("")
+    (package_directory / "models.py").write_text(models_module(models))
+    (package_directory / "services.py").write_text(
+        services_module(chains * depth, depth)
+    )
+
+    main = ["from fastapi import FastAPI", ""]
+    includes = []
+    for router in range(routers):
+        chunk = range(router * per_router, min(routes, (router + 1) * per_router))
+        (package_directory / "routers" / f"router_{router}.py").write_text(
+            router_module(package, chunk, models, depth, chains)
+        )
+        main.append(f"from {package}.routers import router_{router}")
+        includes.append(
+            f'app.include_router(router_{router}.router, prefix="/router_{router}")'
+        )
+    main += ["", "app = FastAPI()", "", *includes]
+    (directory / "main.py").write_text("\n".join(main) + "\n")
+    return directory
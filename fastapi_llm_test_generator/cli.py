@@ -9,7 +9,9 @@ from rich.progress import Progress, SpinnerColumn, TextColumn
 from typer.main import get_command
 from typing_extensions import Annotated
 
+from .llm import ResponseCache
 from .logging import setup_logging
+from .metrics import RunMetrics, profiled
 from .plugins import ai_clients_registry, db_clients_registry
 from .walk_ast import FastAPILLMTestGenerator
 
@@ -22,6 +24,36 @@ COMMAND = "python -m fastapi_llm_test_generator"
 app = typer.Typer(name=NAME, help=HELP, rich_markup_mode="rich")
 
 
+class RouteProgress:
+    """Shows one progress line per route (or group of routes) that is being generated.
+
+    Routes are keyed by their route definition, methods of the same path
+    get a line each.
+    """
+
+    def __init__(self, progress: Progress):
+        self.progress = progress
+        self.tasks = {}
+
+    def __call__(self, route: str, status: str, received: int = 0):
+        if status in ("done", "failed"):
+            task = self.tasks.pop(route, None)
+            if task is not None:
+                self.progress.remove_task(task)
+            return
+
+        if status == "streaming":
+            description = f"{route}: {received} characters received"
+        else:
+            description = f"{route}: waiting for the LLM"
+        if route in self.tasks:
+            self.progress.update(self.tasks[route], description=description)
+        else:
+            self.tasks[route] = self.progress.add_task(
+                description=description, total=None
+            )
+
+
 def load_plugin(registry: Registry, plugin: str = None):
     if plugin not in registry.get_all().keys():
         raise Exception(f"{plugin} not in {registry.namespace[0]} registery")
@@ -100,6 +132,120 @@ def generate(
             help="Run tests with pytest - this might fail due to insufficient config. Be careful!"
         ),
     ] = False,
+    test_workers: Annotated[
+        int,
+        typer.Option(
+            help="Number of parallel pytest sessions the generated test files are sharded over with --run-tests"
+        ),
+    ] = 1,
+    stage_workers: Annotated[
+        Union[str, None],
+        typer.Option(
+            help="Workers per pipeline stage (context, prompt, llm, write, verify), e.g. context=4,llm=8"
+        ),
+    ] = None,
+    concurrency: Annotated[
+        int,
+        typer.Option(help="Number of routes to generate tests for in parallel"),
+    ] = 1,
+    group_by: Annotated[
+        Union[str, None],
+        typer.Option(
+            help="Generate the routes of a module or path prefix (module, prefix) with one prompt"
+        ),
+    ] = None,
+    group_size: Annotated[
+        int,
+        typer.Option(help="Maximum number of routes in one prompt with --group-by"),
+    ] = 8,
+    cache: Annotated[
+        bool,
+        typer.Option(
+            help="Reuse stored LLM responses for identical prompts, --no-cache bypasses it"
+        ),
+    ] = True,
+    cache_dir: Annotated[
+        Union[Path, None],
+        typer.Option(
+            help="Directory of the LLM response cache [default: ~/.cache/fastapi_llm_test_generator]"
+        ),
+    ] = None,
+    clear_cache: Annotated[
+        bool,
+        typer.Option(help="Remove all stored LLM responses before generating"),
+    ] = False,
+    incremental: Annotated[
+        bool,
+        typer.Option(
+            help="Only regenerate tests whose route inputs changed since the last incremental run, recorded in .fastapi_llm_test_manifest.json"
+        ),
+    ] = False,
+    app: Annotated[
+        Union[str, None],
+        typer.Option(
+            help="FastAPI app as module:attr relative to source_app_directory (e.g. main:app), skips searching for it"
+        ),
+    ] = None,
+    dump_call_graph: Annotated[
+        Union[Path, None],
+        typer.Option(help="Write the resolved call graph as JSON for debugging"),
+    ] = None,
+    include_modules: Annotated[
+        Union[str, None],
+        typer.Option(
+            help="Comma separated module globs to treat as your code, e.g. shared_lib.*"
+        ),
+    ] = None,
+    exclude_modules: Annotated[
+        Union[str, None],
+        typer.Option(
+            help="Comma separated module globs never to walk into, e.g. app.generated.*"
+        ),
+    ] = None,
+    static: Annotated[
+        bool,
+        typer.Option(
+            help="Discover routes and sources from the AST only, without importing the app"
+        ),
+    ] = False,
+    max_prompt_tokens: Annotated[
+        Union[int, None],
+        typer.Option(
+            help="Token budget per prompt, less relevant models and functions are reduced to signatures or dropped"
+        ),
+    ] = None,
+    batch: Annotated[
+        bool,
+        typer.Option(
+            help="Submit all prompts through the provider's batch API and wait for the results, resumes an interrupted batch"
+        ),
+    ] = False,
+    batch_poll_interval: Annotated[
+        float,
+        typer.Option(help="Seconds between checks whether the batch has finished"),
+    ] = 60,
+    stream: Annotated[
+        bool,
+        typer.Option(
+            help="Stream LLM responses and write them to the test files as they arrive"
+        ),
+    ] = False,
+    profile: Annotated[
+        Union[Path, None],
+        typer.Option(
+            help="Profile the run, .html files use pyinstrument, anything else cProfile (view with snakeviz/pstats)"
+        ),
+    ] = None,
+    metrics_json: Annotated[
+        Union[Path, None],
+        typer.Option(help="Write per stage and per route timings and token usage as JSON"),
+    ] = None,
+    metrics_prometheus: Annotated[
+        Union[Path, None],
+        typer.Option(
+            help="Write run metrics as a Prometheus textfile (node exporter textfile collector)"
+        ),
+    ] = None,
 ):
     config = {}
 
@@ -127,6 +273,43 @@ def generate(
     prompt_type = prompt_type or config.get("prompt_type", None)
     overwrite = overwrite or config.get("overwrite", False)
     run_tests = run_tests or config.get("run_tests", False)
+    if test_workers == 1:
+        test_workers = config.get("test_workers", 1)
+    stage_workers = stage_workers or config.get("stage_workers", None)
+    if isinstance(stage_workers, str):
+        stage_workers = {
+            name.strip(): int(count)
+            for name, count in (
+                item.split("=") for item in stage_workers.split(",") if item
+            )
+        }
+    if concurrency == 1:
+        concurrency = config.get("concurrency", 1)
+    group_by = group_by or config.get("group_by", None)
+    if group_size == 8:
+        group_size = config.get("group_size", 8)
+    incremental = incremental or config.get("incremental", False)
+    app = app or config.get("app", None)
+    static = static or config.get("static", False)
+    include_modules = include_modules or config.get("include_modules", None)
+    exclude_modules = exclude_modules or config.get("exclude_modules", None)
+    # lists in the config file, comma separated on the command line
+    if isinstance(include_modules, str):
+        include_modules = [m.strip() for m in include_modules.split(",") if m.strip()]
+    if isinstance(exclude_modules, str):
+        exclude_modules = [m.strip() for m in exclude_modules.split(",") if m.strip()]
+    max_prompt_tokens = max_prompt_tokens or config.get("max_prompt_tokens", None)
+    batch = batch or config.get("batch", False)
+    stream = stream or config.get("stream", False)
+    profile = profile or config.get("profile", None)
+    metrics_json = metrics_json or config.get("metrics_json", None)
+    metrics_prometheus = metrics_prometheus or config.get("metrics_prometheus", None)
+    cache = cache and config.get("cache", True)
+    cache_dir = cache_dir or config.get("cache_dir", None)
+
+    response_cache = ResponseCache(cache_dir)
+    if clear_cache:
+        response_cache.clear()
 
     db_plugin_instance = None
     if db_plugin:
@@ -157,14 +340,44 @@ def generate(
         prompt_type,
         overwrite,
         run_tests,
+        concurrency,
+        response_cache if cache else None,
+        incremental,
+        app,
+        dump_call_graph,
+        static,
+        max_prompt_tokens,
+        batch,
+        batch_poll_interval,
+        stream,
+        None,
+        test_workers,
+        stage_workers,
+        RunMetrics(),
+        group_by,
+        group_size,
+        include_modules,
+        exclude_modules,
     )
     with Progress(
         SpinnerColumn(),
         TextColumn("[progress.description]{task.description}"),
         transient=True,
     ) as progress:
-        progress.add_task(description="Generating...", total=None)
-        return generator()
+        if batch:
+            # batches finish as a whole, there is nothing to show per route
+            progress.add_task(description="Waiting for the batch...", total=None)
+        else:
+            generator.progress = RouteProgress(progress)
+        with profiled(profile):
+            routes = generator()
+
+    typer.echo(generator.metrics.summary())
+    if metrics_json:
+        generator.metrics.write_json(metrics_json)
+    if metrics_prometheus:
+        generator.metrics.write_prometheus(metrics_prometheus)
+    return routes
 
 
 @app.callback()
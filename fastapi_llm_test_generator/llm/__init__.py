@@ -1,4 +1,13 @@
-from .generate import make_prompt
+from .batch import BatchState, LocalBatchClient, batch_custom_id
+from .budget import ContextPiece, estimate_tokens, fit_context, summarize_source
+from .cache import CachedAIClient, ResponseCache
+from .generate import (
+    PromptSegment,
+    SegmentedPrompt,
+    make_group_prompt,
+    make_prompt,
+    split_group_response,
+)
 from .prompt import (
     code_prompt_template,
     db_prompt_template,
@@ -6,5 +15,8 @@ from .prompt import (
     function_prompt_template,
     mock_prompt_template,
     pydantic_prompt_template,
+    pytest_instructions_template,
     pytest_prompt_template,
+    pytest_route_template,
 )
+from .stream import CodeFenceExtractor, StreamingFileWriter
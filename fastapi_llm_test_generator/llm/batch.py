@@ -0,0 +1,94 @@
+import hashlib
+import json
+import logging
+import uuid
+from pathlib import Path
+from typing import Union
+
+from fastapi_llm_test_generator.schemas import CodeResponse
+
+logger = logging.getLogger(__name__)
+
+BATCH_STATE_FILE_NAME = ".fastapi_llm_test_batch.json"
+
+
+def batch_custom_id(route_definition: str) -> str:
+    # providers restrict custom ids to a few safe characters
+    return hashlib.sha256(route_definition.encode("utf-8")).hexdigest()[:32]
+
+
+class BatchState:
+    """Submitted batch and its routes, persisted so an interrupted run can resume polling."""
+
+    def __init__(self, test_directory: Union[str, Path]):
+        self.path = Path(test_directory) / BATCH_STATE_FILE_NAME
+        self.batch_id = None
+        # custom id -> {"route_definition", "file_name", "fingerprint"}
+        self.routes = {}
+        if self.path.is_file():
+            state = json.loads(self.path.read_text())
+            self.batch_id = state["batch_id"]
+            self.routes = state["routes"]
+
+    def save(self):
+        self.path.write_text(
+            json.dumps({"batch_id": self.batch_id, "routes": self.routes}, indent=2)
+        )
+
+    def clear(self):
+        self.batch_id = None
+        self.routes = {}
+        self.path.unlink(missing_ok=True)
+
+
+class LocalBatchClient:
+    """Local stand-in for a provider's message batches API.
+
+    Wraps any AI client plugin; requests are answered one by one while polling,
+    and kept on disk, so resuming after a restart works like with a provider.
+    """
+
+    isAsync = False
+
+    def __init__(self, client, directory: Union[str, Path]):
+        self.client = client
+        self.model = getattr(client, "model", None)
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def __call__(self, prompt: str, *args, **kwargs) -> CodeResponse:
+        return self.client(prompt, *args, **kwargs)
+
+    def path(self, batch_id: str) -> Path:
+        return self.directory / f"{batch_id}.json"
+
+    def submit_batch(
+        self, prompts: dict[str, str], max_tokens: int = 2048, temperature: int = 0
+    ) -> str:
+        batch_id = f"local_{uuid.uuid4().hex}"
+        batch = {
+            "params": {"max_tokens": max_tokens, "temperature": temperature},
+            "prompts": prompts,
+            "results": {},
+        }
+        self.path(batch_id).write_text(json.dumps(batch))
+        return batch_id
+
+    def poll_batch(self, batch_id: str) -> bool:
+        path = self.path(batch_id)
+        batch = json.loads(path.read_text())
+        for custom_id, prompt in batch["prompts"].items():
+            if custom_id in batch["results"]:
+                continue
+            response = self.client(prompt, **batch["params"])
+            batch["results"][custom_id] = response.model_dump(
+                exclude={"response", "cached", "retries"}
+            )
+            path.write_text(json.dumps(batch))
+        return True
+
+    def batch_results(self, batch_id: str):
+        batch = json.loads(self.path(batch_id).read_text())
+        for custom_id, result in batch["results"].items():
+            yield custom_id, CodeResponse(**result)
+        self.path(batch_id).unlink(missing_ok=True)
@@ -0,0 +1,91 @@
+import ast
+import logging
+import math
+import re
+import textwrap
+
+logger = logging.getLogger(__name__)
+
+TOKEN_REGEX = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough local token count: ~4 characters per word piece, one per symbol."""
+    if not text:
+        return 0
+    return sum(math.ceil(len(t) / 4) for t in TOKEN_REGEX.findall(text))
+
+
+def summarize_source(source: str) -> str:
+    """Reduce a function or class to its signature, docstring and fields."""
+    source = textwrap.dedent(source)
+    try:
+        tree = ast.parse(source)
+    except SyntaxError:
+        return source.splitlines()[0] + "\n    ...\n" if source else source
+
+    def reduce(node):
+        body = []
+        if ast.get_docstring(node, clean=False) is not None:
+            body.append(node.body[0])
+        if isinstance(node, ast.ClassDef):
+            # keep fields, e.g. of pydantic models, and method signatures
+            for stmt in node.body[len(body) :]:
+                if isinstance(stmt, (ast.AnnAssign, ast.Assign)):
+                    body.append(stmt)
+                elif isinstance(
+                    stmt, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+                ):
+                    body.append(reduce(stmt))
+        else:
+            body.append(ast.Expr(ast.Constant(...)))
+        node.body = body or [ast.Expr(ast.Constant(...))]
+        return node
+
+    tree.body = [
+        reduce(node)
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))
+        else node
+        for node in tree.body
+    ]
+    return ast.unparse(tree) + "\n"
+
+
+class ContextPiece:
+    """A model or function source competing for space in the prompt."""
+
+    __slots__ = ("kind", "name", "source", "score", "text", "tokens")
+
+    def __init__(self, kind: str, name: str, source: str, score: float):
+        self.kind = kind
+        self.name = name
+        self.source = source
+        self.score = score
+        self.text = source
+        self.tokens = estimate_tokens(source)
+
+
+def fit_context(pieces: list[ContextPiece], budget: int) -> list[ContextPiece]:
+    """Keep the most relevant pieces within budget, reducing or dropping the rest.
+
+    Returns the kept pieces in their original order.
+    """
+    kept = set()
+    remaining = budget
+    for piece in sorted(pieces, key=lambda p: -p.score):
+        if piece.tokens <= remaining:
+            kept.add(id(piece))
+            remaining -= piece.tokens
+            continue
+
+        summary = summarize_source(piece.source)
+        tokens = estimate_tokens(summary)
+        if tokens <= remaining:
+            logger.debug(f"Reducing {piece.kind} {piece.name} to its signature")
+            piece.text, piece.tokens = summary, tokens
+            kept.add(id(piece))
+            remaining -= tokens
+        else:
+            logger.debug(f"Dropping {piece.kind} {piece.name} from the prompt")
+
+    return [piece for piece in pieces if id(piece) in kept]
@@ -0,0 +1,211 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Union
+
+from fastapi_llm_test_generator.schemas import CodeResponse
+
+from .system import system_prompt
+
+logger = logging.getLogger(__name__)
+
+
+def default_cache_directory() -> Path:
+    cache_home = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(cache_home) / "fastapi_llm_test_generator"
+
+
+class ResponseCache:
+    """On-disk LLM response cache, addressed by a hash of everything sent to the model."""
+
+    def __init__(
+        self,
+        directory: Union[str, Path] = None,
+        max_size: int = 512 * 1024 * 1024,
+        max_age: float = 30 * 24 * 60 * 60,
+    ):
+        self.directory = Path(directory) if directory else default_cache_directory()
+        self.max_size = max_size  # bytes
+        self.max_age = max_age  # seconds
+
+    def key(
+        self, prompt: Any, model: str = None, max_tokens: int = None, temperature=None
+    ) -> str:
+        payload = json.dumps(
+            {
+                "prompt": prompt,
+                "system": system_prompt,
+                "model": model,
+                "max_tokens": max_tokens,
+                "temperature": temperature,
+            },
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Union[CodeResponse, None]:
+        path = self.path(key)
+        try:
+            stat = path.stat()
+            if self.max_age and time.time() - stat.st_mtime > self.max_age:
+                path.unlink(missing_ok=True)
+                return None
+        except OSError as e:
+            if not isinstance(e, FileNotFoundError):
+                logger.debug(f"Could not read cache entry {path}: {e}")
+            return None
+
+        try:
+            data = json.loads(path.read_text())
+        except Exception as e:
+            logger.debug(f"Ignoring unreadable cache entry {path}: {e}")
+            return None
+
+        # the modification time doubles as "last used" for LRU eviction
+        try:
+            os.utime(path)
+        except OSError as e:
+            logger.debug(f"Could not touch cache entry {path}: {e}")
+        logger.debug(f"Using cached response {key}")
+        return CodeResponse(**data, cached=True)
+
+    def set(self, key: str, response: CodeResponse):
+        """Best effort, a read-only or full cache directory must not fail a paid call."""
+        if response.status != "success":
+            return
+        path = self.path(key)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path.write_text(
+                response.model_dump_json(exclude={"response", "cached", "retries"})
+            )
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.debug(f"Could not write cache entry {path}: {e}")
+            try:
+                tmp_path.unlink(missing_ok=True)
+            except OSError:
+                pass
+
+    def entries(self) -> list[tuple[Path, os.stat_result]]:
+        if not self.directory.exists():
+            return []
+        return [(path, path.stat()) for path in self.directory.glob("*/*.json")]
+
+    def evict(self):
+        """Drop expired entries, then least recently used ones until under max_size."""
+        try:
+            self._evict()
+        except OSError as e:
+            logger.debug(f"Could not evict cache entries in {self.directory}: {e}")
+
+    def _evict(self):
+        now = time.time()
+        entries = []
+        for path, stat in self.entries():
+            if self.max_age and now - stat.st_mtime > self.max_age:
+                path.unlink(missing_ok=True)
+            else:
+                entries.append((path, stat))
+
+        size = sum(stat.st_size for _, stat in entries)
+        for path, stat in sorted(entries, key=lambda entry: entry[1].st_mtime):
+            if not self.max_size or size <= self.max_size:
+                break
+            path.unlink(missing_ok=True)
+            size -= stat.st_size
+
+    def clear(self):
+        for path, _ in self.entries():
+            path.unlink(missing_ok=True)
+        logger.info(f"Cleared response cache {self.directory}")
+
+
+class CachedAIClient:
+    """Wraps an AI client plugin, serving identical requests from a ResponseCache."""
+
+    def __init__(self, client, cache: ResponseCache):
+        self.client = client
+        self.cache = cache
+        self.isAsync = getattr(client, "isAsync", False)
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+    def _key(self, prompt, max_tokens, temperature) -> str:
+        return self.cache.key(
+            prompt, getattr(self.client, "model", None), max_tokens, temperature
+        )
+
+    def __call__(self, prompt, max_tokens: int = 2048, temperature: int = 0):
+        if self.isAsync:
+            return self._async_call(prompt, max_tokens, temperature)
+
+        key = self._key(prompt, max_tokens, temperature)
+        response = self.cache.get(key)
+        if response is None:
+            response = self.client(
+                prompt, max_tokens=max_tokens, temperature=temperature
+            )
+            self.cache.set(key, response)
+        return response
+
+    async def _async_call(self, prompt, max_tokens: int, temperature: int):
+        key = self._key(prompt, max_tokens, temperature)
+        response = self.cache.get(key)
+        if response is None:
+            response = await self.client(
+                prompt, max_tokens=max_tokens, temperature=temperature
+            )
+            self.cache.set(key, response)
+        return response
+
+    def stream(self, prompt, on_text, max_tokens: int = 2048, temperature: int = 0):
+        """Streams through the wrapped client, clients without stream() get one
+        on_text call with the whole response."""
+        if self.isAsync:
+            return self._async_stream(prompt, on_text, max_tokens, temperature)
+
+        if not hasattr(self.client, "stream"):
+            response = self(prompt, max_tokens=max_tokens, temperature=temperature)
+            on_text(response.content)
+            return response
+
+        key = self._key(prompt, max_tokens, temperature)
+        response = self.cache.get(key)
+        if response is not None:
+            on_text(response.content)
+            return response
+        response = self.client.stream(
+            prompt, on_text, max_tokens=max_tokens, temperature=temperature
+        )
+        self.cache.set(key, response)
+        return response
+
+    async def _async_stream(self, prompt, on_text, max_tokens: int, temperature: int):
+        if not hasattr(self.client, "stream"):
+            response = await self._async_call(prompt, max_tokens, temperature)
+            on_text(response.content)
+            return response
+
+        key = self._key(prompt, max_tokens, temperature)
+        response = self.cache.get(key)
+        if response is not None:
+            on_text(response.content)
+            return response
+        response = await self.client.stream(
+            prompt, on_text, max_tokens=max_tokens, temperature=temperature
+        )
+        self.cache.set(key, response)
+        return response
+
+    async def aclose(self):
+        if hasattr(self.client, "aclose"):
+            await self.client.aclose()
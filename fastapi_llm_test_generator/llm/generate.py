@@ -1,14 +1,86 @@
+import re
+
 from .prompt import (
     code_prompt_template,
     db_prompt_template,
+    dependency_prompt_template,
     fixtures_prompt_template,
     function_prompt_template,
+    group_marker_template,
+    group_route_template,
     mock_prompt_template,
     pydantic_prompt_template,
-    pytest_prompt_template,
+    pytest_group_template,
+    pytest_instructions_template,
+    pytest_route_template,
 )
 
 
+class PromptSegment:
+    """Part of a prompt; cache marks the end of a provider prompt cache prefix."""
+
+    __slots__ = ("text", "cache")
+
+    def __init__(self, text: str, cache: bool = False):
+        self.text = text
+        self.cache = cache
+
+    def __repr__(self) -> str:
+        return f"PromptSegment({self.text[:30]!r}..., cache={self.cache})"
+
+
+class SegmentedPrompt(str):
+    """The prompt text, remembering the segments it was built from.
+
+    Being a str, it works with every AI client plugin, clients supporting
+    prompt caching send the segments separately.
+    """
+
+    def __new__(cls, segments: list[PromptSegment]):
+        # whitespace only segments are dropped, providers reject empty blocks
+        segments = tuple(s for s in segments if s.text.strip())
+        prompt = super().__new__(cls, "".join(s.text for s in segments))
+        prompt.segments = segments
+        return prompt
+
+
+def context_segments(
+    additional_prompt_pre: str = None,
+    additional_prompt_info: str = None,
+    mock_prompt: str = None,
+    fixtures_prompt: str = None,
+    pydantic_prompt: str = None,
+    function_prompt: str = None,
+    db_prompt: str = None,
+) -> list[PromptSegment]:
+    # same for every route of a run
+    instructions = pytest_instructions_template.format(
+        additional_prompt_pre=additional_prompt_pre if additional_prompt_pre else "",
+        additional_prompt_info=additional_prompt_info
+        if additional_prompt_info
+        else "",
+        mock_prompt=mock_prompt_template.format(code=mock_prompt)
+        if mock_prompt
+        else "",
+        fixtures_prompt=fixtures_prompt_template.format(code=fixtures_prompt)
+        if fixtures_prompt
+        else "",
+    )
+    # shared by the routes of a module or working on the same tables
+    models = (
+        pydantic_prompt_template.format(code=pydantic_prompt) if pydantic_prompt else ""
+    )
+    context = (db_prompt_template.format(tables=db_prompt) if db_prompt else "") + (
+        function_prompt_template.format(code=function_prompt) if function_prompt else ""
+    )
+    return [
+        PromptSegment(instructions, cache=True),
+        PromptSegment(models, cache=True),
+        # unique to the route, a cache breakpoint would only ever be written
+        PromptSegment(context),
+    ]
+
+
 def make_prompt(
     additional_prompt_pre: str = None,
     additional_prompt_info: str = None,
@@ -21,29 +93,14 @@ def make_prompt(
     code_prompt: str = None,
     additional_prompt_after: str = None,
     prompt_type: str = "pytest",
-):
+    dependency_prompt: str = None,
+) -> SegmentedPrompt:
     if prompt_type == "pytest":
-        prompt = pytest_prompt_template.format(
-            additional_prompt_pre=additional_prompt_pre
-            if additional_prompt_pre
-            else "",
-            additional_prompt_info=additional_prompt_info
-            if additional_prompt_info
-            else "",
-            mock_prompt=mock_prompt_template.format(code=mock_prompt)
-            if mock_prompt
-            else "",
-            fixtures_prompt=fixtures_prompt_template.format(code=fixtures_prompt)
-            if fixtures_prompt
-            else "",
+        route = pytest_route_template.format(
             url=url if url else "",
-            pydantic_prompt=pydantic_prompt_template.format(code=pydantic_prompt)
-            if pydantic_prompt
-            else "",
-            function_prompt=function_prompt_template.format(code=function_prompt)
-            if function_prompt
+            dependency_prompt=dependency_prompt_template.format(tree=dependency_prompt)
+            if dependency_prompt
             else "",
-            db_prompt=db_prompt_template.format(tables=db_prompt) if db_prompt else "",
             code_prompt=code_prompt_template.format(code=code_prompt)
             if code_prompt
             else "",
@@ -51,7 +108,89 @@ def make_prompt(
             if additional_prompt_after
             else "",
         )
+        prompt = SegmentedPrompt(
+            context_segments(
+                additional_prompt_pre,
+                additional_prompt_info,
+                mock_prompt,
+                fixtures_prompt,
+                pydantic_prompt,
+                function_prompt,
+                db_prompt,
+            )
+            + [PromptSegment(route)]
+        )
     else:
         raise Exception(f"prompt_type: {prompt_type} not supported")
 
     return prompt
+
+
+def make_group_prompt(
+    routes: list[tuple[str, list[str], str, str]],
+    additional_prompt_pre: str = None,
+    additional_prompt_info: str = None,
+    mock_prompt: str = None,
+    fixtures_prompt: str = None,
+    pydantic_prompt: str = None,
+    function_prompt: str = None,
+    db_prompt: str = None,
+    additional_prompt_after: str = None,
+    prompt_type: str = "pytest",
+) -> SegmentedPrompt:
+    """One prompt for several routes given as (url, methods, code, dependencies).
+
+    The context is shared, the answer is split per route with split_group_response.
+    """
+    if prompt_type != "pytest":
+        raise Exception(f"prompt_type: {prompt_type} not supported")
+
+    sections = [
+        group_route_template.format(
+            marker=group_marker_template.format(index=index),
+            url=url,
+            methods=", ".join(methods),
+            dependencies=dependency_prompt_template.format(tree=dependencies)
+            if dependencies
+            else "",
+            code=code,
+        )
+        for index, (url, methods, code, dependencies) in enumerate(routes, start=1)
+    ]
+    group = pytest_group_template.format(
+        count=len(routes),
+        example_marker=group_marker_template.format(index=1),
+        routes="".join(sections),
+        additional_prompt_after=additional_prompt_after
+        if additional_prompt_after
+        else "",
+    )
+    return SegmentedPrompt(
+        context_segments(
+            additional_prompt_pre,
+            additional_prompt_info,
+            mock_prompt,
+            fixtures_prompt,
+            pydantic_prompt,
+            function_prompt,
+            db_prompt,
+        )
+        + [PromptSegment(group)]
+    )
+
+
+def split_group_response(content: str, count: int) -> dict[int, str]:
+    """Test module per route number (1 based) of a grouped response."""
+    pattern = re.escape(group_marker_template).replace(
+        re.escape("{index}"), r"(\d+)"
+    )
+    parts = re.split(rf"^[ \t]*{pattern}[ \t]*$", content, flags=re.MULTILINE)
+    # parts: text before the first marker, then (number, module) pairs
+    modules = {}
+    for number, module in zip(parts[1::2], parts[2::2]):
+        index = int(number)
+        # fences the model put around single modules anyway
+        module = re.sub(r"^[ \t]*```\w*[ \t]*$", "", module, flags=re.MULTILINE)
+        if 1 <= index <= count and module.strip():
+            modules[index] = module.strip() + "\n"
+    return modules
@@ -42,6 +42,13 @@ Use these tables if necessary. Ids are usually autoincrement
 ===
 """
 
+dependency_prompt_template = """
+Dependencies of the route, override them with app.dependency_overrides where needed:
+{tree}
+
+===
+"""
+
 code_prompt_template = """
 Route to test:
 python```
@@ -51,6 +58,35 @@ python```
 """
 
 
+# pytest prompts are assembled from segments, most stable first, so that
+# providers can cache the shared beginning across routes
+pytest_instructions_template = """
+
+{additional_prompt_pre}
+
+Write tests(pytest) for the fastapi route(s) given at the end.
+Do not use mocks, use parameterize. If needed create a fixture to insert data.
+Include import statements when needed.
+
+{additional_prompt_info}
+
+{mock_prompt}
+
+{fixtures_prompt}
+"""
+
+pytest_route_template = """
+Url to use: {url}.
+
+{dependency_prompt}
+
+{code_prompt}
+
+{additional_prompt_after}
+
+"""
+
+# the single prompt used before the segments, kept for code formatting it directly
 pytest_prompt_template = """
 
 {additional_prompt_pre}
@@ -78,3 +114,27 @@ Url to use: {url}.
 {additional_prompt_after}
 
 """
+
+group_marker_template = "# === route {index} ==="
+
+pytest_group_template = """
+Write tests for each of the {count} routes below, one complete test module per
+route with its own imports and fixtures. Start the module of every route with
+its marker line exactly as given, e.g. `{example_marker}`. Return all modules
+in a single python code block.
+
+{routes}
+
+{additional_prompt_after}
+
+"""
+
+group_route_template = """
+{marker}
+Url to use: {url}. Methods: {methods}.
+{dependencies}
+python```
+{code}
+```
+===
+"""
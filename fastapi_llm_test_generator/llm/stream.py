@@ -0,0 +1,85 @@
+import os
+from pathlib import Path
+from typing import Union
+
+CODE_FENCE_OPEN = "```python"
+CODE_FENCE_CLOSE = "```"
+
+
+def partial_marker(text: str, marker: str) -> int:
+    """Length of the longest suffix of text that could be the start of marker."""
+    for length in range(min(len(marker) - 1, len(text)), 0, -1):
+        if marker.startswith(text[-length:]):
+            return length
+    return 0
+
+
+class CodeFenceExtractor:
+    """Incremental version of extract_code for streamed responses.
+
+    Text is passed through until a ```python fence shows up, from then on only
+    the fenced code is. feed() returns (reset, text), reset means everything
+    emitted before was prose and has to be discarded.
+    """
+
+    def __init__(self):
+        self.in_code = False
+        self.done = False
+        self.pending = ""
+
+    def feed(self, chunk: str) -> tuple[bool, str]:
+        if self.done:
+            return False, ""
+        text, reset = self.pending + chunk, False
+
+        if not self.in_code:
+            index = text.find(CODE_FENCE_OPEN)
+            if index == -1:
+                hold = partial_marker(text, CODE_FENCE_OPEN)
+                self.pending = text[len(text) - hold :]
+                return False, text[: len(text) - hold]
+            self.in_code, reset = True, True
+            text = text[index + len(CODE_FENCE_OPEN) :]
+
+        index = text.find(CODE_FENCE_CLOSE)
+        if index != -1:
+            self.done, self.pending = True, ""
+            return reset, text[:index]
+        hold = partial_marker(text, CODE_FENCE_CLOSE)
+        self.pending = text[len(text) - hold :]
+        return reset, text[: len(text) - hold]
+
+    def finish(self) -> str:
+        pending, self.pending = self.pending, ""
+        return "" if self.done else pending
+
+
+class StreamingFileWriter:
+    """Writes streamed code to a temp file, renamed over file_name on commit."""
+
+    def __init__(self, file_name: Union[str, Path]):
+        self.file_name = Path(file_name)
+        self.file_name.parent.mkdir(parents=True, exist_ok=True)
+        self.tmp_path = self.file_name.with_name(
+            f".{self.file_name.name}.{os.getpid()}.tmp"
+        )
+        self.file = open(self.tmp_path, "w")
+        self.extractor = CodeFenceExtractor()
+        self.received = 0
+
+    def write(self, chunk: str):
+        self.received += len(chunk)
+        reset, text = self.extractor.feed(chunk)
+        if reset:
+            self.file.seek(0)
+            self.file.truncate()
+        self.file.write(text)
+
+    def commit(self):
+        self.file.write(self.extractor.finish())
+        self.file.close()
+        os.replace(self.tmp_path, self.file_name)
+
+    def abort(self):
+        self.file.close()
+        self.tmp_path.unlink(missing_ok=True)
@@ -0,0 +1,242 @@
+import cProfile
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Union
+
+from fastapi_llm_test_generator.schemas import CodeResponse
+
+logger = logging.getLogger(__name__)
+
+PROMETHEUS_PREFIX = "fastapi_llm_test_generator"
+
+
+class RouteMetrics:
+    __slots__ = (
+        "stages",
+        "input_tokens",
+        "output_tokens",
+        "cache_read_tokens",
+        "cache_creation_tokens",
+        "retries",
+        "cached",
+    )
+
+    def __init__(self):
+        self.stages: dict[str, float] = {}
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cache_read_tokens = 0
+        self.cache_creation_tokens = 0
+        self.retries = 0
+        self.cached = False
+
+    def to_dict(self) -> dict:
+        return {
+            "stages": {k: round(v, 6) for k, v in self.stages.items()},
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "cache_read_tokens": self.cache_read_tokens,
+            "cache_creation_tokens": self.cache_creation_tokens,
+            "retries": self.retries,
+            "cached": self.cached,
+        }
+
+
+class RunMetrics:
+    """Wall time per stage, run-wide and per route, plus token usage of a run."""
+
+    def __init__(self):
+        self.started = time.time()
+        self.wall_time = None
+        # stages that are not tied to one route, e.g. discovery
+        self.stages: dict[str, float] = {}
+        self.routes: dict[str, RouteMetrics] = {}
+
+    def route(self, route: str) -> RouteMetrics:
+        if route not in self.routes:
+            self.routes[route] = RouteMetrics()
+        return self.routes[route]
+
+    def add(self, stage: str, seconds: float, route: str = None):
+        stages = self.route(route).stages if route else self.stages
+        stages[stage] = stages.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def timed(self, stage: str, route: str = None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start, route)
+
+    def record_response(self, route: str, response: CodeResponse):
+        metrics = self.route(route)
+        metrics.retries += response.retries
+        if response.cached:
+            # served from the response cache, nothing was spent
+            metrics.cached = True
+            return
+        metrics.input_tokens += response.input_tokens or 0
+        metrics.output_tokens += response.tokens_used or 0
+        metrics.cache_read_tokens += response.cache_read_input_tokens or 0
+        metrics.cache_creation_tokens += response.cache_creation_input_tokens or 0
+
+    def finish(self):
+        self.wall_time = time.time() - self.started
+
+    def stage_totals(self) -> dict[str, tuple[float, int, float]]:
+        """stage -> (total seconds, routes, max seconds of a single route)."""
+        totals = {stage: (seconds, 0, 0.0) for stage, seconds in self.stages.items()}
+        for route in self.routes.values():
+            for stage, seconds in route.stages.items():
+                total, count, longest = totals.get(stage, (0.0, 0, 0.0))
+                totals[stage] = (total + seconds, count + 1, max(longest, seconds))
+        return totals
+
+    def totals(self) -> dict:
+        routes = self.routes.values()
+        return {
+            "routes": len(self.routes),
+            "cached_responses": sum(r.cached for r in routes),
+            "input_tokens": sum(r.input_tokens for r in routes),
+            "output_tokens": sum(r.output_tokens for r in routes),
+            "cache_read_tokens": sum(r.cache_read_tokens for r in routes),
+            "cache_creation_tokens": sum(r.cache_creation_tokens for r in routes),
+            "retries": sum(r.retries for r in routes),
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            "started": self.started,
+            "wall_time": self.wall_time,
+            "totals": self.totals(),
+            "stages": {
+                stage: {"seconds": round(total, 6), "routes": count, "max": longest}
+                for stage, (total, count, longest) in self.stage_totals().items()
+            },
+            "run_stages": {k: round(v, 6) for k, v in self.stages.items()},
+            "routes": {name: r.to_dict() for name, r in self.routes.items()},
+        }
+
+    def summary(self) -> str:
+        lines = [
+            f"{'stage':<14} {'total s':>9} {'routes':>7} {'mean s':>8} {'max s':>8}"
+        ]
+        for stage, (total, count, longest) in self.stage_totals().items():
+            mean = total / count if count else total
+            lines.append(
+                f"{stage:<14} {total:>9.3f} {count:>7} {mean:>8.3f} {longest:>8.3f}"
+            )
+        totals = self.totals()
+        lines.append(
+            f"{totals['routes']} routes, {totals['input_tokens']} input / "
+            f"{totals['output_tokens']} output tokens "
+            f"({totals['cache_read_tokens']} input tokens read from the prompt cache), "
+            f"{totals['retries']} retries, "
+            f"{totals['cached_responses']} cached responses"
+            + (f", {self.wall_time:.2f}s wall time" if self.wall_time else "")
+        )
+        return "\n".join(lines)
+
+    def write_json(self, path: Union[str, Path]):
+        Path(path).write_text(json.dumps(self.to_dict(), indent=2))
+
+    def prometheus(self) -> str:
+        def metric(name: str, help: str, samples: list[tuple[str, float]]):
+            # every value describes the last run, so all of them are gauges
+            name = f"{PROMETHEUS_PREFIX}_{name}"
+            lines = [f"# HELP {name} {help}", f"# TYPE {name} gauge"]
+            lines += [f"{name}{labels} {value}" for labels, value in samples]
+            return lines
+
+        totals = self.totals()
+        lines = []
+        lines += metric(
+            "stage_seconds",
+            "Wall time spent per stage in the last run, summed over routes.",
+            [
+                (f'{{stage="{stage}"}}', round(total, 6))
+                for stage, (total, _, _) in self.stage_totals().items()
+            ],
+        )
+        lines += metric(
+            "tokens",
+            "LLM tokens used in the last run.",
+            [
+                ('{direction="input"}', totals["input_tokens"]),
+                ('{direction="output"}', totals["output_tokens"]),
+                ('{direction="cache_read"}', totals["cache_read_tokens"]),
+                ('{direction="cache_creation"}', totals["cache_creation_tokens"]),
+            ],
+        )
+        lines += metric(
+            "retries", "LLM request retries in the last run.", [("", totals["retries"])]
+        )
+        lines += metric(
+            "routes",
+            "Routes processed in the last run.",
+            [
+                ('{cached="false"}', totals["routes"] - totals["cached_responses"]),
+                ('{cached="true"}', totals["cached_responses"]),
+            ],
+        )
+        lines += metric(
+            "run_seconds",
+            "Wall time of the last run.",
+            [("", round(self.wall_time or 0, 6))],
+        )
+        lines += metric(
+            "last_run_timestamp_seconds",
+            "Start of the last run.",
+            [("", round(self.started, 3))],
+        )
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: Union[str, Path]):
+        # the node exporter's textfile collector may read at any time
+        path = Path(path)
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(self.prometheus())
+        os.replace(tmp_path, path)
+
+
+def timed(metrics: Union[RunMetrics, None], stage: str, route: str = None):
+    return metrics.timed(stage, route) if metrics is not None else nullcontext()
+
+
+@contextmanager
+def profiled(path: Union[str, Path, None]):
+    """Profile the block with pyinstrument (for .html paths) or cProfile."""
+    if path is None:
+        yield
+        return
+
+    path = Path(path)
+    if path.suffix == ".html":
+        try:
+            from pyinstrument import Profiler
+        except ImportError as e:
+            raise Exception(
+                "HTML profiles need pyinstrument: pip install pyinstrument"
+            ) from e
+
+        profiler = Profiler(async_mode="enabled")
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            path.write_text(profiler.output_html())
+    else:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.dump_stats(path)
+    logger.info(f"Profile written to {path}")
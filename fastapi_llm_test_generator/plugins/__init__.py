@@ -2,7 +2,7 @@ import logging
 
 from catalogue import Registry
 
-from .ai_clients import AnthropicClient, ai_clients_registry
+from .ai_clients import AnthropicClient, AsyncAnthropicClient, ai_clients_registry
 from .db_clients import AsyncpgDBPlugin, Psycopg2DBPlugin, db_clients_registry
 
 logger = logging.getLogger(__name__)
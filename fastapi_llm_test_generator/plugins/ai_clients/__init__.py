@@ -4,4 +4,9 @@ ai_clients_registry = catalogue.create(
     "ai_clients", "ai_clients_registry", entry_points=True
 )
 
-from .anthropic_client import AnthropicClient, register_anthropic_client
+from .anthropic_client import (
+    AnthropicClient,
+    AsyncAnthropicClient,
+    register_anthropic_client,
+    register_async_anthropic_client,
+)
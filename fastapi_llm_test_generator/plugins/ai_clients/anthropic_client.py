@@ -1,7 +1,11 @@
+import asyncio
 import logging
+import random
 import re
+from typing import Union
 
 from anthropic import Anthropic as Anthropic
+from anthropic import APIConnectionError, APIStatusError, AsyncAnthropic
 
 from fastapi_llm_test_generator.llm.system import system_prompt
 from fastapi_llm_test_generator.schemas import CodeResponse
@@ -10,8 +14,86 @@ from . import ai_clients_registry
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_MODEL = "claude-3-5-sonnet-latest"
+
+# rate limited, overloaded (529) or otherwise temporarily unavailable
+RETRY_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+
+
+def extract_code(text: str) -> str:
+    if "```python" in text:
+        pattern = r"(?<=```python)(.*?)(?=```)"
+        match = re.search(pattern, text, re.DOTALL)
+        if match:
+            text = match.group(0)
+    return text
+
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, APIConnectionError):
+        return True
+    return (
+        isinstance(error, APIStatusError)
+        and error.status_code in RETRY_STATUS_CODES
+    )
+
+
+def message_content(prompt: str) -> Union[str, list[dict]]:
+    segments = getattr(prompt, "segments", None)
+    if not segments:
+        return f"{prompt}"
+    # a cache breakpoint after each stable segment, the prefix up to it
+    # (system prompt included) is reused by later requests
+    return [
+        {"type": "text", "text": segment.text}
+        | ({"cache_control": {"type": "ephemeral"}} if segment.cache else {})
+        for segment in segments
+    ]
+
+
+def message_params(
+    prompt: str, model: str, max_tokens: int = 2048, temperature: int = 0
+) -> dict:
+    return dict(
+        max_tokens=max_tokens,  # 1024,
+        temperature=temperature,
+        system=system_prompt,
+        messages=[
+            {
+                "role": "user",
+                "content": message_content(prompt),
+            },
+        ],
+        model=model,
+    )
+
+
+def code_response(message) -> CodeResponse:
+    text = extract_code(message.content[0].text)
+
+    logger.debug(f"AI Client response:\n {text}")
+
+    return CodeResponse(
+        content=text,
+        tokens_used=message.usage.output_tokens,
+        input_tokens=message.usage.input_tokens,
+        cache_read_input_tokens=getattr(message.usage, "cache_read_input_tokens", None),
+        cache_creation_input_tokens=getattr(
+            message.usage, "cache_creation_input_tokens", None
+        ),
+        response=message,
+    )
+
+
+def batch_result(result) -> CodeResponse:
+    if result.result.type == "succeeded":
+        return code_response(result.result.message)
+    return CodeResponse(content="", status=result.result.type, response=result)
+
 
 class AnthropicClient:
+    isAsync = False
+
     def __init__(self, ANTHROPIC_API_KEY: str, model: str = None):
         if ANTHROPIC_API_KEY is None or ANTHROPIC_API_KEY == "":
             raise Exception("Please provide an API KEY")
@@ -21,39 +103,180 @@ class AnthropicClient:
         )
 
         if model is None:
-            model = "claude-3-5-sonnet-latest"
+            model = DEFAULT_MODEL
         self.model = model
 
     def __call__(
         self, prompt: str, max_tokens: int = 2048, temperature: int = 0
     ) -> CodeResponse:
         message = self.client.messages.create(
-            max_tokens=max_tokens,  # 1024,
-            temperature=temperature,
-            system=system_prompt,
-            messages=[
+            **message_params(prompt, self.model, max_tokens, temperature)
+        )
+        return code_response(message)
+
+    def stream(
+        self, prompt: str, on_text, max_tokens: int = 2048, temperature: int = 0
+    ) -> CodeResponse:
+        """Like __call__, passing each text chunk to on_text as it arrives."""
+        with self.client.messages.stream(
+            **message_params(prompt, self.model, max_tokens, temperature)
+        ) as stream:
+            for text in stream.text_stream:
+                on_text(text)
+            message = stream.get_final_message()
+        return code_response(message)
+
+    def submit_batch(
+        self, prompts: dict[str, str], max_tokens: int = 2048, temperature: int = 0
+    ) -> str:
+        batch = self.client.messages.batches.create(
+            requests=[
                 {
-                    "role": "user",
-                    "content": f"{prompt}",
-                },
-            ],
-            model=self.model,
+                    "custom_id": custom_id,
+                    "params": message_params(
+                        prompt, self.model, max_tokens, temperature
+                    ),
+                }
+                for custom_id, prompt in prompts.items()
+            ]
         )
+        return batch.id
+
+    def poll_batch(self, batch_id: str) -> bool:
+        batch = self.client.messages.batches.retrieve(batch_id)
+        logger.debug(f"Batch {batch_id}: {batch.request_counts}")
+        return batch.processing_status == "ended"
 
-        text = message.content[0].text
-        if "```python" in text:
-            pattern = r"(?<=```python)(.*?)(?=```)"
-            match = re.search(pattern, text, re.DOTALL)
-            if match:
-                text = match.group(0)
+    def batch_results(self, batch_id: str):
+        for result in self.client.messages.batches.results(batch_id):
+            yield result.custom_id, batch_result(result)
 
-        logger.debug(f"AI Client response:\n {text}")
 
-        return CodeResponse(
-            content=text, tokens_used=message.usage.output_tokens, response=message
+class AsyncAnthropicClient:
+    """Awaitable client sharing one connection pool, retrying transient errors."""
+
+    isAsync = True
+
+    def __init__(
+        self,
+        ANTHROPIC_API_KEY: str,
+        model: str = None,
+        max_retries: int = 6,
+        backoff_base: float = 1.0,
+        backoff_max: float = 60.0,
+    ):
+        if ANTHROPIC_API_KEY is None or ANTHROPIC_API_KEY == "":
+            raise Exception("Please provide an API KEY")
+
+        self.api_key = ANTHROPIC_API_KEY
+        self.model = model or DEFAULT_MODEL
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._client = None
+
+    @property
+    def client(self) -> AsyncAnthropic:
+        # created lazily so the connection pool belongs to the running event loop
+        if self._client is None:
+            # retries are handled here, with jitter, instead of inside the SDK
+            self._client = AsyncAnthropic(api_key=self.api_key, max_retries=0)
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+    def backoff(self, attempt: int) -> float:
+        # "full jitter": sleep a random amount up to the exponential bound
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2**attempt))
+
+    async def __call__(
+        self, prompt: str, max_tokens: int = 2048, temperature: int = 0
+    ) -> CodeResponse:
+        attempt = 0
+        while True:
+            try:
+                message = await self.client.messages.create(
+                    **message_params(prompt, self.model, max_tokens, temperature)
+                )
+                break
+            except Exception as e:
+                if not is_retryable(e) or attempt >= self.max_retries:
+                    raise e
+                delay = self.backoff(attempt)
+                attempt += 1
+                logger.warning(
+                    f"AI Client request failed ({e}), retry {attempt}/{self.max_retries} in {delay:.1f}s"
+                )
+                await asyncio.sleep(delay)
+
+        response = code_response(message)
+        response.retries = attempt
+        return response
+
+    async def stream(
+        self, prompt: str, on_text, max_tokens: int = 2048, temperature: int = 0
+    ) -> CodeResponse:
+        attempt = 0
+        while True:
+            received = False
+            try:
+                async with self.client.messages.stream(
+                    **message_params(prompt, self.model, max_tokens, temperature)
+                ) as stream:
+                    async for text in stream.text_stream:
+                        received = True
+                        on_text(text)
+                    message = await stream.get_final_message()
+                break
+            except Exception as e:
+                # text already handed out can't be taken back, only retry before that
+                if received or not is_retryable(e) or attempt >= self.max_retries:
+                    raise e
+                delay = self.backoff(attempt)
+                attempt += 1
+                logger.warning(
+                    f"AI Client stream failed ({e}), retry {attempt}/{self.max_retries} in {delay:.1f}s"
+                )
+                await asyncio.sleep(delay)
+
+        response = code_response(message)
+        response.retries = attempt
+        return response
+
+    async def submit_batch(
+        self, prompts: dict[str, str], max_tokens: int = 2048, temperature: int = 0
+    ) -> str:
+        batch = await self.client.messages.batches.create(
+            requests=[
+                {
+                    "custom_id": custom_id,
+                    "params": message_params(
+                        prompt, self.model, max_tokens, temperature
+                    ),
+                }
+                for custom_id, prompt in prompts.items()
+            ]
         )
+        return batch.id
+
+    async def poll_batch(self, batch_id: str) -> bool:
+        batch = await self.client.messages.batches.retrieve(batch_id)
+        logger.debug(f"Batch {batch_id}: {batch.request_counts}")
+        return batch.processing_status == "ended"
+
+    async def batch_results(self, batch_id: str):
+        async for result in await self.client.messages.batches.results(batch_id):
+            yield result.custom_id, batch_result(result)
 
 
 @ai_clients_registry.register("anthropic")
 def register_anthropic_client(ANTHROPIC_API_KEY: str, model: str = None):
     return AnthropicClient(ANTHROPIC_API_KEY=ANTHROPIC_API_KEY, model=model)
+
+
+@ai_clients_registry.register("anthropic_async")
+def register_async_anthropic_client(ANTHROPIC_API_KEY: str, model: str = None):
+    return AsyncAnthropicClient(ANTHROPIC_API_KEY=ANTHROPIC_API_KEY, model=model)
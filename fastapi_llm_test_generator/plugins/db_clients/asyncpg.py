@@ -1,11 +1,8 @@
-import inspect
-import re
-from typing import Any, Callable, Union
+import asyncio
 
 from . import db_clients_registry
 from .base import BaseDBPlugin
 
-SQL_TABLE_REGEX = r"\b(?:FROM|JOIN|INTO|UPDATE)\s+([a-zA-Z_][a-zA-Z0-9_]*)\b(?!\s*\()"
 import typer
 
 app = typer.Typer()
@@ -18,17 +15,26 @@ logger = logging.getLogger(__name__)
 class AsyncpgDBPlugin(BaseDBPlugin):
     def __init__(self, db_url, isAsync=True):
         super().__init__(db_url, isAsync)
+        self.pool = None
+        self.lock = None
 
-    def extract_table_names(self, source_code: Union[str, Callable]) -> list[Any]:
-        if callable(source_code):
-            source_code = inspect.getsource(source_code)
-        source_code = re.sub(r"^\s*import.*\n", "", source_code, flags=re.MULTILINE)
-        source_code = re.sub(
-            r"^\s*from\s+[^\n]+\s+import.*\n", "", source_code, flags=re.MULTILINE
-        )
+    async def open(self):
+        if self.pool is not None:
+            return
+        try:
+            import asyncpg
 
-        # Find table names in SQL queries
-        return re.findall(SQL_TABLE_REGEX, source_code, re.IGNORECASE)
+            self.pool = await asyncpg.create_pool(dsn=self.db_url)
+            self.lock = asyncio.Lock()
+        except Exception as e:
+            logger.warning(f"Could not setup database. Is asyncpg installed ?: {e}")
+            raise e
+
+    async def close(self):
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+        super().close()
 
     def generate_markdown(self, table_name, columns, constraints, indexes):
         # Generate Markdown
@@ -53,34 +59,55 @@ class AsyncpgDBPlugin(BaseDBPlugin):
             markdown_output += f"| {idx['indexname']} | {idx['indexdef']} |\n"
         return markdown_output
 
-    async def get_table_definitions(self, table_name: str) -> tuple:
-        try:
-            import asyncpg
+    async def get_tables_definitions(
+        self, table_names: list[str]
+    ) -> dict[str, tuple]:
+        if self.pool is None:
+            await self.open()
+
+        # concurrent routes wait for each other instead of fetching the same tables
+        async with self.lock:
+            missing = self.missing_tables(table_names)
+            if not missing:
+                return self.cached_table_definitions(table_names)
+
+            column_query = """SELECT table_name, column_name, data_type, is_nullable, column_default
+                    FROM information_schema.columns
+                    WHERE table_name = ANY($1::text[])
+                    ORDER BY table_name, ordinal_position;"""
+
+            constraint_query = """SELECT t.relname AS table_name, conname AS constraint_name,
+                contype AS constraint_type, a.attname AS column_name
+            FROM   pg_constraint c
+            JOIN   pg_class t ON t.oid = c.conrelid
+            JOIN   pg_attribute a ON a.attnum = ANY(c.conkey) AND a.attrelid = c.conrelid
+            WHERE  t.relname = ANY($1::text[]) AND pg_table_is_visible(t.oid);"""
+
+            index_query = """SELECT tablename, indexname, indexdef
+            FROM   pg_indexes
+            WHERE  tablename = ANY($1::text[]);"""
+
+            # each query runs on its own pooled connection
+            columns, constraints, indexes = await asyncio.gather(
+                self.pool.fetch(column_query, missing),
+                self.pool.fetch(constraint_query, missing),
+                self.pool.fetch(index_query, missing),
+            )
+
+            # records are kept whole, generate_markdown reads them by column name
+            self.cache_table_definitions(
+                missing,
+                columns,
+                constraints,
+                indexes,
+                key=lambda row: (row[0], row),
+            )
+
+        return self.cached_table_definitions(table_names)
 
-            async with asyncpg.create_pool(dsn=self.db_url) as pool:
-                async with pool.acquire() as conn:
-                    column_query = """SELECT column_name, data_type, is_nullable, column_default
-                            FROM information_schema.columns
-                            WHERE table_name = $1;"""
-                    columns = await conn.fetch(column_query, table_name)
-
-                    constraint_query = """SELECT conname AS constraint_name, contype AS constraint_type, 
-                        a.attname AS column_name
-                    FROM   pg_constraint c
-                    JOIN   pg_attribute a ON a.attnum = ANY(c.conkey) AND a.attrelid = c.conrelid
-                    WHERE  c.conrelid = $1::regclass;"""
-                    constraints = await conn.fetch(constraint_query, table_name)
-
-                    index_query = """SELECT indexname, indexdef
-                    FROM   pg_indexes
-                    WHERE  tablename = $1;"""
-                    indexes = await conn.fetch(index_query, table_name)
-
-                return columns, constraints, indexes
-
-        except Exception as e:
-            logger.warning(f"Could not setup database. Is asyncpg installed ?: {e}")
-            raise e
+    async def get_table_definitions(self, table_name: str) -> tuple:
+        definitions = await self.get_tables_definitions([table_name])
+        return definitions.get(table_name, ([], [], []))
 
 
 @db_clients_registry.register("asyncpg")
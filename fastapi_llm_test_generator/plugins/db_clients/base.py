@@ -1,4 +1,9 @@
-from typing import Any, Callable, Union
+import logging
+from typing import Any, Awaitable, Callable, Union
+
+from .sql import TableNames, unqualified
+
+logger = logging.getLogger(__name__)
 
 
 class BaseDBPlugin:
@@ -8,14 +13,88 @@ class BaseDBPlugin:
             raise Exception("Please provide a database url")
         self.db_url = db_url
         self.isAsync = isAsync
+        # run-scoped schema cache: table name -> (columns, constraints, indexes),
+        # None for names that turned out not to be tables
+        self.table_definitions: dict[str, Union[tuple, None]] = {}
+        # run-scoped cache of the tables each function and source uses
+        self.table_names = TableNames()
+
+    def open(self):
+        """Acquire run-wide resources, e.g. connections. Called once per run."""
+
+    def close(self):
+        """Release run-wide resources, also ends the schema cache of the run."""
+        self.table_definitions.clear()
+        self.table_names.clear()
 
     def extract_table_names(self, source_code: Union[str, Callable]) -> list[Any]:
-        raise NotImplementedError
+        """Deduplicated tables used by a function or source, see sql.source_table_names.
 
-    def get_table_definitions(self, table_name: str) -> tuple[list[Any]]:
-        raise NotImplementedError
+        The catalog is looked up by table name, so schema qualified names are
+        reduced to the table.
+        """
+        return list(dict.fromkeys(unqualified(t) for t in self.table_names(source_code)))
+
+    def missing_tables(self, table_names: list[str]) -> list[str]:
+        return [
+            table
+            for table in dict.fromkeys(table_names)
+            if table not in self.table_definitions
+        ]
 
-    async def get_table_definitions(self, table_name: str) -> tuple[list[Any]]:
+    def cache_table_definitions(
+        self, table_names: list[str], columns, constraints, indexes, key
+    ):
+        """Group bulk catalog rows per table via `key` and store them in the cache."""
+        grouped = {table: ([], [], []) for table in table_names}
+        for i, rows in enumerate((columns, constraints, indexes)):
+            for row in rows:
+                table, row = key(row)
+                if table in grouped:
+                    grouped[table][i].append(row)
+
+        for table, table_def in grouped.items():
+            # without columns the name is not a table (e.g. a CTE or a typo)
+            self.table_definitions[table] = table_def if table_def[0] else None
+
+    def cached_table_definitions(self, table_names: list[str]) -> dict[str, tuple]:
+        return {
+            table: self.table_definitions[table]
+            for table in dict.fromkeys(table_names)
+            if self.table_definitions.get(table)
+        }
+
+    def get_tables_definitions(
+        self, table_names: list[str]
+    ) -> Union[dict[str, tuple], Awaitable[dict[str, tuple]]]:
+        """Definitions of all tables of a route, an awaitable for async plugins.
+
+        Looks the tables up one by one with get_table_definitions (a coroutine
+        function for async plugins), plugins override it to fetch in bulk.
+        """
+        if self.isAsync:
+            return self.async_get_tables_definitions(table_names)
+        definitions = {}
+        for table in dict.fromkeys(table_names):
+            try:
+                definitions[table] = self.get_table_definitions(table_name=table)
+            except Exception as e:  # TODO catch DB Errors
+                logger.debug(f"Could not fetch table definition of {table}: {e}")
+        return definitions
+
+    async def async_get_tables_definitions(
+        self, table_names: list[str]
+    ) -> dict[str, tuple]:
+        definitions = {}
+        for table in dict.fromkeys(table_names):
+            try:
+                definitions[table] = await self.get_table_definitions(table_name=table)
+            except Exception as e:  # TODO catch DB Errors
+                logger.debug(f"Could not fetch table definition of {table}: {e}")
+        return definitions
+
+    def get_table_definitions(self, table_name: str) -> tuple[list[Any]]:
+        """(columns, constraints, indexes) of a table, async def for async plugins."""
         raise NotImplementedError
 
     def generate_markdown(
@@ -1,12 +1,8 @@
-import inspect
-import re
-from typing import Any, Callable, Union
+import threading
 
 from . import db_clients_registry
 from .base import BaseDBPlugin
 
-SQL_TABLE_REGEX = r"\b(?:FROM|JOIN|INTO|UPDATE)\s+([a-zA-Z_][a-zA-Z0-9_]*)\b(?!\s*\()"
-
 
 import logging
 
@@ -16,17 +12,32 @@ logger = logging.getLogger(__name__)
 class Psycopg2DBPlugin(BaseDBPlugin):
     def __init__(self, db_url: str, isAsync=False):
         super().__init__(db_url, isAsync)
-
-    def extract_table_names(self, source_code: Union[str, Callable]) -> list[Any]:
-        if callable(source_code):
-            source_code = inspect.getsource(source_code)
-        source_code = re.sub(r"^\s*import.*\n", "", source_code, flags=re.MULTILINE)
-        source_code = re.sub(
-            r"^\s*from\s+[^\n]+\s+import.*\n", "", source_code, flags=re.MULTILINE
-        )
-
-        # Find table names in SQL queries
-        return re.findall(SQL_TABLE_REGEX, source_code, re.IGNORECASE)
+        self.conn = None
+        # guards the connection and the schema cache when routes run in threads
+        self.lock = threading.RLock()
+
+    def open(self):
+        with self.lock:
+            if self.conn is not None and not self.conn.closed:
+                return
+            try:
+                import psycopg2
+
+                self.conn = psycopg2.connect(self.db_url)
+                # catalog reads only, no need to hold a transaction open
+                self.conn.autocommit = True
+            except Exception as e:
+                logger.warning(
+                    f"Could not setup database. Is psycopg2 installed ?: {e}"
+                )
+                raise e
+
+    def close(self):
+        with self.lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+            super().close()
 
     def generate_markdown(self, table_name, columns, constraints, indexes):
         # Generate Markdown
@@ -52,54 +63,50 @@ class Psycopg2DBPlugin(BaseDBPlugin):
 
         return markdown_output
 
-    def get_table_definitions(self, table_name: str) -> tuple:
-        try:
-            import psycopg2
-
-            conn = psycopg2.connect(self.db_url)
-
-            cur = conn.cursor()
-            cur.execute(
-                """
-            SELECT column_name, data_type, is_nullable, column_default
-            FROM information_schema.columns
-            WHERE table_name = %s;
-            """,
-                (table_name,),
+    def get_tables_definitions(self, table_names: list[str]) -> dict[str, tuple]:
+        with self.lock:
+            missing = self.missing_tables(table_names)
+            if not missing:
+                return self.cached_table_definitions(table_names)
+
+            self.open()
+            # columns, constraints and indexes in a single round-trip
+            with self.conn.cursor() as cur:
+                cur.execute(
+                    """
+                SELECT
+                    (SELECT json_agg(json_build_array(
+                            table_name, column_name, data_type, is_nullable, column_default
+                        ) ORDER BY table_name, ordinal_position)
+                     FROM information_schema.columns
+                     WHERE table_name = ANY(%(tables)s)),
+                    (SELECT json_agg(json_build_array(
+                            t.relname, conname, contype, a.attname
+                        ))
+                     FROM   pg_constraint c
+                     JOIN   pg_class t ON t.oid = c.conrelid
+                     JOIN   pg_attribute a ON a.attnum = ANY(c.conkey) AND a.attrelid = c.conrelid
+                     WHERE  t.relname = ANY(%(tables)s) AND pg_table_is_visible(t.oid)),
+                    (SELECT json_agg(json_build_array(tablename, indexname, indexdef))
+                     FROM   pg_indexes
+                     WHERE  tablename = ANY(%(tables)s));
+                """,
+                    {"tables": missing},
+                )
+                columns, constraints, indexes = cur.fetchone()
+
+            self.cache_table_definitions(
+                missing,
+                columns or [],
+                constraints or [],
+                indexes or [],
+                key=lambda row: (row[0], tuple(row[1:])),
             )
-            columns = cur.fetchall()
-
-            # Constraints
-            cur.execute(
-                """
-            SELECT conname AS constraint_name, contype AS constraint_type, a.attname AS column_name
-            FROM   pg_constraint c
-            JOIN   pg_attribute a ON a.attnum = ANY(c.conkey) AND a.attrelid = c.conrelid
-            WHERE  c.conrelid = %s::regclass;
-            """,
-                (table_name,),
-            )
-            constraints = cur.fetchall()
-
-            # Indexes
-            cur.execute(
-                """
-            SELECT indexname, indexdef
-            FROM   pg_indexes
-            WHERE  tablename = %s;
-            """,
-                (table_name,),
-            )
-            indexes = cur.fetchall()
 
-            cur.close()
-            conn.close()
+            return self.cached_table_definitions(table_names)
 
-            return columns, constraints, indexes
-
-        except Exception as e:
-            logger.warning(f"Could not setup database. Is psycopg2 installed ?: {e}")
-            raise e
+    def get_table_definitions(self, table_name: str) -> tuple:
+        return self.get_tables_definitions([table_name]).get(table_name, ([], [], []))
 
 
 @db_clients_registry.register("psycopg2")
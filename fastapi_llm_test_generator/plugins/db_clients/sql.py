@@ -0,0 +1,408 @@
+import ast
+import inspect
+import re
+import sys
+import textwrap
+from typing import Any, Callable, Union
+
+from fastapi_llm_test_generator.source import StaticSymbol, get_source
+
+# the first keyword of a string literal that is a SQL statement
+STATEMENT_KEYWORDS = {
+    "ALTER",
+    "COPY",
+    "CREATE",
+    "DELETE",
+    "DROP",
+    "INSERT",
+    "LOCK",
+    "MERGE",
+    "SELECT",
+    "TRUNCATE",
+    "UPDATE",
+    "WITH",
+}
+
+# keywords followed by a table name
+TABLE_KEYWORDS = {"FROM", "JOIN", "INTO", "UPDATE", "TABLE", "TRUNCATE", "USING"}
+
+# clauses that can follow a table name, anything else after it is an alias
+CLAUSE_KEYWORDS = {
+    "AS",
+    "CROSS",
+    "DO",
+    "EXCEPT",
+    "FETCH",
+    "FOR",
+    "FULL",
+    "GROUP",
+    "HAVING",
+    "IF",
+    "INNER",
+    "INTERSECT",
+    "JOIN",
+    "LATERAL",
+    "LEFT",
+    "LIMIT",
+    "NATURAL",
+    "NOT",
+    "NOWAIT",
+    "OF",
+    "OFFSET",
+    "ON",
+    "ONLY",
+    "ORDER",
+    "OUTER",
+    "RETURNING",
+    "RIGHT",
+    "SELECT",
+    "SET",
+    "SKIP",
+    "TABLE",
+    "TABLESAMPLE",
+    "UNION",
+    "USING",
+    "VALUES",
+    "WHERE",
+    "WINDOW",
+}
+
+# methods and functions whose arguments are SQL, e.g. cursor.execute(...),
+# connection.fetch(...) or sqlalchemy.text(...)
+SQL_CALLS = {
+    "copy_expert",
+    "exec_driver_sql",
+    "execute",
+    "executemany",
+    "fetch",
+    "fetchrow",
+    "fetchval",
+    "mogrify",
+    "prepare",
+    "text",
+}
+
+# sources without any of these have no tables, and are not parsed
+TABLE_HINT_REGEX = re.compile(
+    r"\b(?:from|into|join|update|table|truncate|__tablename__)\b", re.IGNORECASE
+)
+
+SQL_TOKEN_REGEX = re.compile(
+    r"""
+    (?P<comment>--[^\n]*|/\*.*?\*/)
+    |(?P<string>'(?:[^']|'')*')
+    |(?P<quoted>"(?:[^"]|"")+")
+    |(?P<word>[A-Za-z_][A-Za-z0-9_$]*)
+    |(?P<punctuation>[().,;])
+    |(?P<other>\S)
+    """,
+    re.DOTALL | re.VERBOSE,
+)
+
+
+def sql_tokens(sql: str) -> list[tuple[str, str]]:
+    """(kind, value) tokens of a SQL string, without comments and string literals."""
+    tokens = []
+    for match in SQL_TOKEN_REGEX.finditer(sql):
+        kind = match.lastgroup
+        if kind in ("comment", "string"):
+            continue
+        tokens.append((kind, match.group()))
+    return tokens
+
+
+def keyword(token: tuple[str, str]) -> Union[str, None]:
+    return token[1].upper() if token[0] == "word" else None
+
+
+def identifier(token: tuple[str, str]) -> Union[str, None]:
+    """The name a token refers to, unquoted identifiers fold to lower case."""
+    kind, value = token
+    if kind == "quoted":
+        return value[1:-1].replace('""', '"')
+    if kind == "word" and value.upper() not in CLAUSE_KEYWORDS:
+        return value.lower()
+    return None
+
+
+class SQLScanner:
+    """Finds the tables a SQL statement reads or writes, CTEs excluded."""
+
+    def __init__(self, sql: str):
+        self.tokens = sql_tokens(sql)
+        self.position = 0
+
+    def peek(self, offset: int = 0) -> tuple[str, str]:
+        position = self.position + offset
+        return self.tokens[position] if position < len(self.tokens) else ("", "")
+
+    def qualified_name(self) -> Union[str, None]:
+        """schema.table at the current position, None if there is no name."""
+        while keyword(self.peek()) in ("ONLY", "LATERAL"):
+            self.position += 1
+        if [keyword(self.peek(i)) for i in range(3)] == ["IF", "NOT", "EXISTS"]:
+            self.position += 3
+        parts = []
+        while True:
+            part = identifier(self.peek())
+            if part is None:
+                return None
+            parts.append(part)
+            self.position += 1
+            if self.peek() != ("punctuation", "."):
+                return ".".join(parts)
+            self.position += 1
+
+    def group_end(self, offset: int) -> int:
+        """Offset after the parenthesized group starting at offset."""
+        depth = 0
+        while self.position + offset < len(self.tokens):
+            depth += {"(": 1, ")": -1}.get(self.peek(offset)[1], 0)
+            offset += 1
+            if not depth:
+                break
+        return offset
+
+    def skip_alias(self):
+        if keyword(self.peek()) == "AS":
+            self.position += 1
+        if identifier(self.peek()) is not None:
+            self.position += 1
+
+    def tables(self) -> list[str]:
+        tables = []
+        ctes = set()
+        # per open parenthesis: whether it holds a query, FROM inside e.g.
+        # EXTRACT(YEAR FROM ts) is not followed by a table
+        parens = []
+        while self.position < len(self.tokens):
+            token = self.peek()
+            word = keyword(token)
+            if token == ("punctuation", "("):
+                parens.append(keyword(self.peek(1)) in ("SELECT", "WITH", "VALUES"))
+            elif token == ("punctuation", ")"):
+                if parens:
+                    parens.pop()
+            elif word in ("WITH", "RECURSIVE") or (token[1] == "," and not parens):
+                # name [(columns)] AS ( of a common table expression
+                name = identifier(self.peek(1))
+                offset = 2
+                if name is not None and self.peek(offset) == ("punctuation", "("):
+                    offset = self.group_end(offset)
+                if (
+                    name is not None
+                    and keyword(self.peek(offset)) == "AS"
+                    and self.peek(offset + 1) == ("punctuation", "(")
+                ):
+                    ctes.add(name)
+            elif word in TABLE_KEYWORDS and (not parens or parens[-1]):
+                self.position += 1
+                tables += self.table_list(word)
+                continue
+            self.position += 1
+        return [table for table in tables if table not in ctes]
+
+    def table_list(self, word: str) -> list[str]:
+        tables = []
+        while True:
+            name = self.qualified_name()
+            if name is None:
+                return tables
+            if word in ("FROM", "JOIN", "USING") and self.peek() == ("punctuation", "("):
+                # a set returning function, e.g. FROM generate_series(1, 3)
+                self.position = self.position + self.group_end(0)
+                name = None
+            if word == "UPDATE":
+                self.skip_alias()
+                if keyword(self.peek()) != "SET":
+                    # FOR UPDATE ..., or prose that starts with "update"
+                    return tables
+            if name is not None:
+                tables.append(name)
+            if word not in ("FROM", "USING"):
+                return tables
+            # FROM a, b AS c
+            self.skip_alias()
+            if self.peek() != ("punctuation", ","):
+                return tables
+            self.position += 1
+
+
+def sql_table_names(sql: str) -> list[str]:
+    """Tables in a SQL string, schema qualified where the query qualifies them."""
+    return SQLScanner(sql).tables()
+
+
+def is_sql(text: str) -> bool:
+    tokens = [token for token in sql_tokens(text) if token[1] != "("]
+    return bool(tokens) and keyword(tokens[0]) in STATEMENT_KEYWORDS
+
+
+def literal_text(node: ast.AST) -> Union[str, None]:
+    """The text of a string literal, an f-string or a concatenation of them."""
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+    if isinstance(node, ast.JoinedStr):
+        # interpolated values are not names, a placeholder keeps them apart
+        return "".join(
+            value.value if isinstance(value, ast.Constant) else " ? "
+            for value in node.values
+        )
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add):
+        left, right = literal_text(node.left), literal_text(node.right)
+        if left is not None and right is not None:
+            return left + right
+    return None
+
+
+def call_name(node: ast.Call) -> Union[str, None]:
+    if isinstance(node.func, ast.Attribute):
+        return node.func.attr
+    if isinstance(node.func, ast.Name):
+        return node.func.id
+    return None
+
+
+def sqlalchemy_table_name(value: Any) -> Union[str, None]:
+    """The table of a SQLAlchemy Table or mapped class, read without running descriptors."""
+    table = value
+    if inspect.isclass(value):
+        table = inspect.getattr_static(value, "__table__", None)
+    table_class = type(table)
+    if table_class.__name__ != "Table" or not table_class.__module__.startswith(
+        "sqlalchemy"
+    ):
+        return None
+    name = inspect.getattr_static(table, "name", None)
+    schema = inspect.getattr_static(table, "schema", None)
+    if not isinstance(name, str):
+        return None
+    return f"{schema}.{name}" if isinstance(schema, str) else name
+
+
+def source_table_names(source_code: str) -> list[str]:
+    """Tables used in Python source: SQL in string literals and calls taking SQL,
+    and SQLAlchemy Table("...") / __tablename__ declarations."""
+    if not TABLE_HINT_REGEX.search(source_code):
+        return []
+    source_code = textwrap.dedent(source_code)
+    try:
+        tree = ast.parse(source_code)
+    except SyntaxError:
+        # not a complete snippet, treat all of it as SQL
+        return sql_table_names(source_code)
+
+    # docstrings are prose, e.g. "Loads the rows from users"
+    docstrings = set()
+    tables = []
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        if isinstance(
+            node, (ast.Module, ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)
+        ):
+            if node.body and isinstance(node.body[0], ast.Expr):
+                docstrings.add(id(node.body[0].value))
+        text = literal_text(node) if id(node) not in docstrings else None
+        if text is not None:
+            if is_sql(text):
+                tables += sql_table_names(text)
+            continue
+        if isinstance(node, ast.Call):
+            name = call_name(node)
+            if name in SQL_CALLS:
+                for arg in node.args[:1]:
+                    text = literal_text(arg)
+                    if text is not None and not is_sql(text):
+                        tables += sql_table_names(text)
+            elif name == "Table" and node.args:
+                # sqlalchemy.Table("name", metadata, ..., schema="schema")
+                table = literal_text(node.args[0])
+                schema = next(
+                    (literal_text(k.value) for k in node.keywords if k.arg == "schema"),
+                    None,
+                )
+                if table:
+                    tables.append(f"{schema}.{table}" if schema else table)
+        elif isinstance(node, ast.Assign) and any(
+            isinstance(target, ast.Name) and target.id == "__tablename__"
+            for target in node.targets
+        ):
+            table = literal_text(node.value)
+            if table:
+                tables.append(table)
+        stack.extend(reversed(list(ast.iter_child_nodes(node))))
+    return list(dict.fromkeys(tables))
+
+
+def referenced_table_names(func: Callable, source_code: str) -> list[str]:
+    """Tables of the SQLAlchemy models and Table objects a function refers to by name."""
+    if isinstance(func, StaticSymbol) or "sqlalchemy" not in sys.modules:
+        # statically resolved, or the app has no SQLAlchemy objects to refer to
+        return []
+    func = inspect.unwrap(func)
+    func = getattr(func, "__func__", func)  # bound methods
+    namespace = getattr(func, "__globals__", None)
+    if namespace is None:
+        module = sys.modules.get(getattr(func, "__module__", None) or "")
+        namespace = vars(module) if module is not None else {}
+    try:
+        tree = ast.parse(textwrap.dedent(source_code))
+    except SyntaxError:
+        return []
+
+    tables = []
+    for node in ast.walk(tree):
+        value = None
+        if isinstance(node, ast.Name):
+            value = namespace.get(node.id)
+        elif isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name):
+            # db_models.User
+            module = namespace.get(node.value.id)
+            if inspect.ismodule(module):
+                value = vars(module).get(node.attr)
+        if value is not None:
+            table = sqlalchemy_table_name(value)
+            if table:
+                tables.append(table)
+    return list(dict.fromkeys(tables))
+
+
+def unqualified(table: str) -> str:
+    return table.rsplit(".", 1)[-1]
+
+
+class TableNames:
+    """Run-wide cache of the tables used by functions and sources.
+
+    Results are kept per function object and per source text, so a helper
+    used by many routes, or code shared between functions, is parsed once.
+    """
+
+    def __init__(self):
+        self.functions: dict[Any, tuple[str, ...]] = {}
+        self.sources: dict[str, tuple[str, ...]] = {}
+
+    def __call__(self, source_code: Union[str, Callable]) -> tuple[str, ...]:
+        if not callable(source_code):
+            return self.source(source_code)
+        func = source_code
+        if func not in self.functions:
+            self.functions[func] = self.function(func)
+        return self.functions[func]
+
+    def function(self, func: Callable) -> tuple[str, ...]:
+        source_code = get_source(func)
+        tables = self.source(source_code) + tuple(
+            referenced_table_names(func, source_code)
+        )
+        return tuple(dict.fromkeys(tables))
+
+    def source(self, source_code: str) -> tuple[str, ...]:
+        if source_code not in self.sources:
+            self.sources[source_code] = tuple(source_table_names(source_code))
+        return self.sources[source_code]
+
+    def clear(self):
+        self.functions.clear()
+        self.sources.clear()
@@ -1,9 +1,11 @@
-import inspect
+import logging
 
 from fastapi_llm_test_generator.schemas import Walker
 
+logger = logging.getLogger(__name__)
 
-def use_db_plugin(plugin_instance, route: Walker) -> Walker:
+
+def route_table_names(plugin_instance, route: Walker) -> list[str]:
     tables = []
     table = plugin_instance.extract_table_names(route.source_code)
     if table:
@@ -11,19 +13,19 @@ def use_db_plugin(plugin_instance, route: Walker) -> Walker:
 
     if route.function_calls:
         for name, func in route.function_calls.items():
+            # functions rather than their sources, plugins cache per function
             try:
-                func_source_code = inspect.getsource(func)
+                table = plugin_instance.extract_table_names(func)
             except Exception as e:
                 continue
-            table = plugin_instance.extract_table_names(func_source_code)
             if table:
                 tables.extend(table)
 
-    for table in tables:
-        try:
-            table_def = plugin_instance.get_table_definitions(table_name=table)
-        except Exception as e:  # TODO catch DB Errors
-            continue
+    return list(dict.fromkeys(tables))
+
+
+def add_table_definitions(plugin_instance, route: Walker, table_defs: dict) -> Walker:
+    for table, table_def in table_defs.items():
         markdown = plugin_instance.generate_markdown(table, *table_def)
 
         route.table_markdowns.append(markdown)
@@ -31,24 +33,17 @@ def use_db_plugin(plugin_instance, route: Walker) -> Walker:
     return route
 
 
-async def async_use_db_plugin(plugin_instance, route: Walker) -> Walker:
-    tables = []
-    table = plugin_instance.extract_table_names(route.source_code)
-    if table:
-        tables.extend(table)
-
-    if route.function_calls:
-        for name, func in route.function_calls.items():
-            func_source_code = inspect.getsource(func)
-            table = plugin_instance.extract_table_names(func_source_code)
-            if table:
-                tables.extend(table)
-
-    for table in tables:
-        table_def = await plugin_instance.get_table_definitions(table_name=table)
-        markdown = plugin_instance.generate_markdown(table, *table_def)
+def use_db_plugin(plugin_instance, route: Walker) -> Walker:
+    tables = route_table_names(plugin_instance, route)
+    try:
+        table_defs = plugin_instance.get_tables_definitions(tables)
+    except Exception as e:  # TODO catch DB Errors
+        logger.debug(f"Could not fetch table definitions for {tables}: {e}")
+        return route
+    return add_table_definitions(plugin_instance, route, table_defs)
 
-        route.table_markdowns.append(markdown)
-        route.table_defs[table] = table_def
 
-    return route
+async def async_use_db_plugin(plugin_instance, route: Walker) -> Walker:
+    tables = route_table_names(plugin_instance, route)
+    table_defs = await plugin_instance.get_tables_definitions(tables)
+    return add_table_definitions(plugin_instance, route, table_defs)
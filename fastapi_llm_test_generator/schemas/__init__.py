@@ -1,13 +1,27 @@
 from typing import Any, Callable, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class CodeResponse(BaseModel):
     content: str
     status: str = "success"
-    tokens_used: Optional[int] = None
+    tokens_used: Optional[int] = None  # output tokens
+    input_tokens: Optional[int] = None
+    # prompt caching: input tokens read from / written to the provider's cache
+    cache_read_input_tokens: Optional[int] = None
+    cache_creation_input_tokens: Optional[int] = None
+    retries: int = 0
     response: Optional[Any] = None
+    cached: bool = False
+
+
+class GeneratedTestResult(BaseModel):
+    file_path: str
+    name: str
+    outcome: str  # passed, failed, error or skipped
+    duration: float = 0.0
+    message: Optional[str] = None
 
 
 class Walker(BaseModel):
@@ -16,6 +30,8 @@ class Walker(BaseModel):
     route_definition: str  # Acts as an ID for skipping already generated tests
     pydantic_models: Optional[set] = None
     function_calls: Optional[dict[str, Callable]] = None
+    dependency_tree: Optional[str] = None  # rendered Depends(...) tree
 
-    table_markdowns: Optional[list[str]] = []
-    table_defs: Optional[dict] = {}
+    table_markdowns: Optional[list[str]] = Field(default_factory=list)
+    table_defs: Optional[dict] = Field(default_factory=dict)
+    test_results: Optional[list[GeneratedTestResult]] = None
@@ -0,0 +1,40 @@
+import ast
+import inspect
+from pathlib import Path
+from typing import Any, Union
+
+
+class StaticSymbol:
+    """A function or class resolved from the AST, without importing its module."""
+
+    def __init__(
+        self,
+        module: str,
+        qualname: str,
+        file_path: Union[str, Path],
+        source: str,
+        node: Union[ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef],
+    ):
+        self.__module__ = module
+        self.__qualname__ = qualname
+        self.__name__ = qualname.rsplit(".", 1)[-1]
+        self.file_path = str(file_path)
+        self.source = source
+        self.node = node
+
+    @property
+    def is_class(self) -> bool:
+        return isinstance(self.node, ast.ClassDef)
+
+    def __call__(self, *args, **kwargs):
+        raise TypeError(f"{self.__qualname__} was resolved statically, not imported")
+
+    def __repr__(self) -> str:
+        return f"<StaticSymbol {self.__module__}.{self.__qualname__}>"
+
+
+def get_source(obj: Any) -> str:
+    """inspect.getsource that also understands statically resolved symbols."""
+    if isinstance(obj, StaticSymbol):
+        return obj.source
+    return inspect.getsource(obj)
@@ -1,8 +1,10 @@
 import ast
+import fnmatch
 import importlib
 import logging
 import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from typing import Union
 
@@ -11,6 +13,16 @@ import typer
 logger = logging.getLogger(__name__)
 
 
+def route_definition(route) -> str:
+    """Key of a route, e.g. "/items_{'GET', 'POST'}".
+
+    Methods are sorted, str() of the methods set would depend on the hash seed
+    of the process and give multi-method routes another key in every run.
+    """
+    methods = ", ".join(repr(method) for method in sorted(route.methods))
+    return f"{route.path}_{{{methods}}}"
+
+
 def load_fastapi_app(module, function_name: str):
     try:
         create_app = getattr(module, function_name, None)
@@ -29,50 +41,168 @@ def load_fastapi_module(fastapi_app_file: str):
     return module, spec
 
 
-def find_fastapi_app(directory: str) -> Union[Path, None]:
+IGNORED_DIRECTORIES = {
+    ".git",
+    ".hg",
+    ".svn",
+    ".venv",
+    "venv",
+    ".env",
+    "env",
+    ".tox",
+    ".nox",
+    ".eggs",
+    ".mypy_cache",
+    ".pytest_cache",
+    ".ruff_cache",
+    "__pycache__",
+    "site-packages",
+    "node_modules",
+    "build",
+    "dist",
+}
+
+# below this many candidate files parsing inline beats starting worker processes
+PROCESS_POOL_THRESHOLD = 8
+
+
+class GitIgnore:
+    """Minimal .gitignore matcher: name and path globs, dir-only and negated patterns."""
+
+    def __init__(self):
+        self.rules = []
+
+    def add(self, directory: Path):
+        gitignore = directory / ".gitignore"
+        if not gitignore.is_file():
+            return
+        for line in gitignore.read_text(errors="ignore").splitlines():
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            negate = line.startswith("!")
+            line = line.lstrip("!")
+            dir_only = line.endswith("/")
+            line = line.strip("/")
+            if line:
+                self.rules.append((directory, line, dir_only, negate))
+
+    def ignored(self, path: Path, is_dir: bool) -> bool:
+        ignored = False
+        for base, pattern, dir_only, negate in self.rules:
+            if dir_only and not is_dir:
+                continue
+            try:
+                relative = path.relative_to(base).as_posix()
+            except ValueError:
+                continue
+            # patterns with a slash are anchored to the .gitignore directory
+            target = relative if "/" in pattern else path.name
+            if fnmatch.fnmatch(target, pattern) or fnmatch.fnmatch(
+                relative, f"{pattern}/*"
+            ):
+                ignored = not negate
+        return ignored
+
+
+def iter_python_files(directory: Path):
+    gitignore = GitIgnore()
+    for root, dirs, files in os.walk(directory):
+        root = Path(root)
+        gitignore.add(root)
+        # prune in place so os.walk never descends into ignored directories
+        dirs[:] = sorted(
+            d
+            for d in dirs
+            if d not in IGNORED_DIRECTORIES
+            and not d.endswith(".egg-info")
+            and not (root / d / "pyvenv.cfg").exists()
+            and not gitignore.ignored(root / d, is_dir=True)
+        )
+        for file in sorted(files):
+            if file.endswith(".py") and not gitignore.ignored(root / file, False):
+                yield root / file
+
+
+def mentions_fastapi(file_path: Path) -> bool:
+    # cheap byte check, most files never mention FastAPI and are never parsed
+    try:
+        with open(file_path, "rb") as f:
+            return b"FastAPI" in f.read()
+    except OSError as e:
+        logger.debug(f"Skipping {file_path}: {e}")
+        return False
+
+
+def find_fastapi_app_in_file(file_path: Path) -> Union[tuple, None]:
+    try:
+        with open(file_path, "rb") as f:
+            tree = ast.parse(f.read(), filename=str(file_path))
+
+        for node in ast.walk(tree):
+            if isinstance(node, ast.FunctionDef):
+                fastapi_instance = None
+                for stmt in node.body:
+                    if isinstance(stmt, ast.Assign):
+                        if (
+                            isinstance(stmt.value, ast.Call)
+                            and isinstance(stmt.value.func, ast.Name)
+                            and stmt.value.func.id == "FastAPI"
+                        ):
+                            fastapi_instance = stmt.targets[0].id
+                    # if there is a fastapi instance then this is something like create_app()
+                    if isinstance(stmt, ast.Return) and isinstance(
+                        stmt.value, ast.Name
+                    ):
+                        if stmt.value.id == fastapi_instance:
+                            return file_path, node.name, None
+                    # TODO find other ways e.g. plain old app = FastAPI and also adjust walktree
+
+            elif isinstance(node, ast.Assign):
+                if isinstance(node.value, ast.Call) and isinstance(
+                    node.value.func, ast.Name
+                ):
+                    if node.value.func.id == "FastAPI":
+                        fastapi_instance = node.targets[
+                            0
+                        ].id  # Capture the FastAPI instance
+                        return file_path, None, fastapi_instance
+
+    except Exception as e:
+        logger.debug(f"Skipping {file_path}: {e}")
+    return None
+
+
+def resolve_app_reference(directory: Path, app_reference: str) -> tuple:
+    """Resolve `package.module:attr` to the module file without scanning."""
+    module_name, _, attr = app_reference.partition(":")
+    module_path = directory / Path(*module_name.split("."))
+    for file_path in (module_path.with_suffix(".py"), module_path / "__init__.py"):
+        if file_path.is_file():
+            return file_path, None, attr or "app"
+    raise Exception(f"Could not find module {module_name} in {directory}")
+
+
+def find_fastapi_app(directory: str, app_reference: str = None) -> tuple:
     directory = Path(directory).resolve()
-    for root, _, files in os.walk(directory):
-        # TODO enumerate more common virtual envs. Or is there another way to do this ?
-        if "venv" in root or "env" in root or "site-packages" in root:
-            continue
-        for file in files:
-            if file.endswith(".py"):
-                file_path = Path(root) / file
-                try:
-                    with open(file_path, "r", encoding="utf-8") as f:
-                        tree = ast.parse(f.read(), filename=str(file_path))
-
-                    for node in ast.walk(tree):
-                        if isinstance(node, ast.FunctionDef):
-                            fastapi_instance = None
-                            for stmt in node.body:
-                                if isinstance(stmt, ast.Assign):
-                                    if (
-                                        isinstance(stmt.value, ast.Call)
-                                        and isinstance(stmt.value.func, ast.Name)
-                                        and stmt.value.func.id == "FastAPI"
-                                    ):
-                                        fastapi_instance = stmt.targets[0].id
-                                # if there is a fastapi instance then this is something like create_app()
-                                if isinstance(stmt, ast.Return) and isinstance(
-                                    stmt.value, ast.Name
-                                ):
-                                    if stmt.value.id == fastapi_instance:
-                                        return file_path, node.name, None
-                                # TODO find other ways e.g. plain old app = FastAPI and also adjust walktree
-
-                        elif isinstance(node, ast.Assign):
-                            if isinstance(node.value, ast.Call) and isinstance(
-                                node.value.func, ast.Name
-                            ):
-                                if node.value.func.id == "FastAPI":
-                                    fastapi_instance = node.targets[
-                                        0
-                                    ].id  # Capture the FastAPI instance
-                                    return file_path, None, fastapi_instance
-
-                except Exception as e:
-                    logger.debug(f"Skipping {file_path}: {e}")
+    if app_reference:
+        return resolve_app_reference(directory, app_reference)
+
+    candidates = [
+        file_path
+        for file_path in iter_python_files(directory)
+        if mentions_fastapi(file_path)
+    ]
+    if len(candidates) < PROCESS_POOL_THRESHOLD:
+        results = map(find_fastapi_app_in_file, candidates)
+    else:
+        with ProcessPoolExecutor() as executor:
+            # map keeps the walk order, so the first match stays deterministic
+            results = list(executor.map(find_fastapi_app_in_file, candidates))
+
+    for result in results:
+        if result:
+            return result
     return None, None, None
 
 
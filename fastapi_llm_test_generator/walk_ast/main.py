@@ -1,6 +1,8 @@
 from pathlib import Path
-from typing import Any, Union
+from typing import Any, Callable, Union
 
+from fastapi_llm_test_generator.llm import ResponseCache
+from fastapi_llm_test_generator.metrics import RunMetrics
 from fastapi_llm_test_generator.schemas import CodeResponse, Walker
 
 from .walker import walker
@@ -23,6 +25,24 @@ class FastAPILLMTestGenerator:
         prompt_type: str = "pytest",
         overwrite: bool = None,
         run_tests: bool = None,
+        concurrency: int = 1,
+        response_cache: ResponseCache = None,
+        incremental: bool = False,
+        app_reference: str = None,
+        call_graph_dump: Union[str, Path] = None,
+        static: bool = False,
+        max_prompt_tokens: int = None,
+        batch: bool = False,
+        batch_poll_interval: float = 60,
+        stream: bool = False,
+        progress: Callable = None,
+        test_workers: int = 1,
+        stage_workers: dict[str, int] = None,
+        metrics: RunMetrics = None,
+        group_by: str = None,
+        group_size: int = 8,
+        include_modules: list[str] = None,
+        exclude_modules: list[str] = None,
     ):
         self.source_app_directory = source_app_directory
         self.ai_client_plugin_instance = ai_client_plugin_instance
@@ -38,6 +58,24 @@ class FastAPILLMTestGenerator:
         self.prompt_type = prompt_type
         self.overwrite = overwrite
         self.run_tests = run_tests
+        self.concurrency = concurrency
+        self.response_cache = response_cache
+        self.incremental = incremental
+        self.app_reference = app_reference
+        self.call_graph_dump = call_graph_dump
+        self.static = static
+        self.max_prompt_tokens = max_prompt_tokens
+        self.batch = batch
+        self.batch_poll_interval = batch_poll_interval
+        self.stream = stream
+        self.progress = progress
+        self.test_workers = test_workers
+        self.stage_workers = stage_workers
+        self.metrics = metrics
+        self.group_by = group_by
+        self.group_size = group_size
+        self.include_modules = include_modules
+        self.exclude_modules = exclude_modules
 
     def __call__(self) -> list[tuple[Walker, CodeResponse]]:
         routes = walker(
@@ -55,5 +93,23 @@ class FastAPILLMTestGenerator:
             prompt_type=self.prompt_type,
             overwrite=self.overwrite,
             run_tests=self.run_tests,
+            concurrency=self.concurrency,
+            response_cache=self.response_cache,
+            incremental=self.incremental,
+            app_reference=self.app_reference,
+            call_graph_dump=self.call_graph_dump,
+            static=self.static,
+            max_prompt_tokens=self.max_prompt_tokens,
+            batch=self.batch,
+            batch_poll_interval=self.batch_poll_interval,
+            stream=self.stream,
+            progress=self.progress,
+            test_workers=self.test_workers,
+            stage_workers=self.stage_workers,
+            metrics=self.metrics,
+            group_by=self.group_by,
+            group_size=self.group_size,
+            include_modules=self.include_modules,
+            exclude_modules=self.exclude_modules,
         )
         return routes
@@ -0,0 +1,68 @@
+import hashlib
+import json
+import logging
+from pathlib import Path
+from typing import Any, Callable, Iterable, Union
+
+from fastapi_llm_test_generator.schemas import Walker
+from fastapi_llm_test_generator.source import get_source
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE_NAME = ".fastapi_llm_test_manifest.json"
+
+
+def route_fingerprint(
+    route: Walker, source: Callable[[Any], str] = get_source, **prompt_options
+) -> str:
+    """Hash of everything that ends up in the prompt of a route."""
+    hasher = hashlib.sha256()
+
+    def update(*parts):
+        for part in parts:
+            hasher.update(str(part).encode("utf-8"))
+            hasher.update(b"\0")
+
+    update(route.route_definition, route.source_code)
+    for name, func in (route.function_calls or {}).items():
+        update(name, source(func))
+    for model_source in sorted(source(m) for m in route.pydantic_models or []):
+        update(model_source)
+    for markdown in sorted(route.table_markdowns or []):
+        update(markdown)
+    if route.dependency_tree:
+        update(route.dependency_tree)
+    update(json.dumps(prompt_options, sort_keys=True, default=str))
+
+    return hasher.hexdigest()
+
+
+class Manifest:
+    """Maps Walker.route_definition to the fingerprint its test file was generated from."""
+
+    def __init__(self, test_directory: Union[str, Path]):
+        self.path = Path(test_directory) / MANIFEST_FILE_NAME
+        self.fingerprints = {}
+        if self.path.is_file():
+            try:
+                self.fingerprints = json.loads(self.path.read_text())
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable manifest {self.path}: {e}")
+
+    def get(self, route_definition: str) -> Union[str, None]:
+        return self.fingerprints.get(route_definition)
+
+    def set(self, route_definition: str, fingerprint: str):
+        self.fingerprints[route_definition] = fingerprint
+
+    def prune(self, route_definitions: Iterable[str]):
+        """Drop the entries of routes that no longer exist in the app."""
+        route_definitions = set(route_definitions)
+        stale = [key for key in self.fingerprints if key not in route_definitions]
+        for key in stale:
+            del self.fingerprints[key]
+        if stale:
+            logger.debug(f"Dropped {len(stale)} stale manifest entries")
+
+    def save(self):
+        self.path.write_text(json.dumps(self.fingerprints, indent=2, sort_keys=True))
@@ -0,0 +1,117 @@
+import ast
+import inspect
+import sys
+import typing
+from typing import Any, Callable, Iterable, Union
+
+from pydantic import BaseModel
+
+
+def is_pydantic_model(obj: Any) -> bool:
+    return inspect.isclass(obj) and issubclass(obj, BaseModel) and obj is not BaseModel
+
+
+def model_key(model: Any) -> tuple[str, str]:
+    return (model.__module__, model.__qualname__)
+
+
+def forward_ref_names(annotation: Union[str, typing.ForwardRef]) -> list[str]:
+    """Names in a string annotation, e.g. "list[Item]" -> ["list", "Item"]."""
+    if isinstance(annotation, typing.ForwardRef):
+        annotation = annotation.__forward_arg__
+    try:
+        tree = ast.parse(annotation, mode="eval")
+    except SyntaxError:
+        return []
+    return [node.id for node in ast.walk(tree) if isinstance(node, ast.Name)]
+
+
+def annotation_models(annotation: Any, namespace: dict = None) -> list[type]:
+    """Pydantic models in a type, e.g. Optional[list[dict[str, Item]]] or Annotated[Item, ...].
+
+    Forward references are looked up by name in namespace, never evaluated.
+    """
+    models = []
+    seen = set()
+    stack = [annotation]
+    while stack:
+        annotation = stack.pop()
+        if id(annotation) in seen:
+            continue
+        seen.add(id(annotation))
+
+        if is_pydantic_model(annotation):
+            metadata = getattr(annotation, "__pydantic_generic_metadata__", None) or {}
+            if metadata.get("origin"):
+                # Page[Item] has no source of its own, Page and Item have
+                stack += reversed((metadata["origin"], *metadata.get("args", ())))
+            else:
+                models.append(annotation)
+            continue
+        if isinstance(annotation, (str, typing.ForwardRef)):
+            if namespace is not None:
+                names = forward_ref_names(annotation)
+                stack += reversed([namespace[n] for n in names if n in namespace])
+            continue
+        if typing.get_origin(annotation) is typing.Annotated:
+            # the metadata are not types
+            args = typing.get_args(annotation)[:1]
+        else:
+            args = typing.get_args(annotation)
+        # type aliases, `type Items = list[Item]`
+        value = getattr(annotation, "__value__", None)
+        if value is not None and not args:
+            args = (value,)
+        stack.extend(reversed(args))
+    return models
+
+
+def model_dependencies(model: type) -> list[type]:
+    """The models a model needs to be understood: its bases and field types."""
+    module = sys.modules.get(model.__module__)
+    namespace = vars(module) if module is not None else None
+
+    dependencies = []
+    for base in model.__bases__:
+        if is_pydantic_model(base) and not base.__module__.startswith("pydantic"):
+            dependencies += annotation_models(base)
+    for field in model.model_fields.values():
+        dependencies += annotation_models(field.annotation, namespace)
+    return [d for d in dict.fromkeys(dependencies) if d is not model]
+
+
+class ModelGraph:
+    """Run-wide cache of the models every pydantic model refers to."""
+
+    def __init__(self, resolve: Callable = None):
+        # resolve(model) -> models it depends on, the static mode resolves from the AST
+        self.resolve = resolve or model_dependencies
+        self.edges: dict[Any, tuple] = {}
+
+    def dependencies(self, model) -> tuple:
+        if model not in self.edges:
+            self.edges[model] = tuple(self.resolve(model))
+        return self.edges[model]
+
+    def closure(self, models: Iterable) -> list:
+        """models and all models they reach, each after the models it depends on."""
+        ordered = []
+        visited = set()
+        # sorted roots, so the order is the same across runs
+        for root in sorted(models, key=model_key):
+            if root in visited:
+                continue
+            visited.add(root)
+            # iterative post-order, chains of nested models can be deep
+            stack = [(root, iter(self.dependencies(root)))]
+            while stack:
+                model, dependencies = stack[-1]
+                for dependency in dependencies:
+                    if dependency not in visited:
+                        visited.add(dependency)
+                        stack.append((dependency, iter(self.dependencies(dependency))))
+                        break
+                else:
+                    stack.pop()
+                    ordered.append(model)
+        return ordered
@@ -0,0 +1,110 @@
+import asyncio
+import logging
+from typing import Callable, Iterable
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+class Stage:
+    """A pipeline step with its own workers, fed through a bounded queue.
+
+    handler is awaited with one item, or with a list of up to batch_size items
+    that are already queued, and returns the item(s) for the next stage.
+    None (or an empty list) drops the item.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable,
+        workers: int = 1,
+        batch_size: int = 1,
+        queue_size: int = None,
+    ):
+        self.name = name
+        self.handler = handler
+        self.workers = max(workers, 1)
+        self.batch_size = max(batch_size, 1)
+        self.queue_size = queue_size or 2 * self.workers
+        self.queue = None
+        self.max_depth = 0
+
+
+class Pipeline:
+    def __init__(self, stages: list[Stage], on_error: Callable = None):
+        self.stages = stages
+        self.on_error = on_error
+
+    async def _work(self, stage: Stage, forward: Callable):
+        while True:
+            items = [await stage.queue.get()]
+            # every worker takes exactly one _DONE, it finishes its batch and stops
+            while (
+                items[-1] is not _DONE
+                and len(items) < stage.batch_size
+                and not stage.queue.empty()
+            ):
+                items.append(stage.queue.get_nowait())
+            done = items[-1] is _DONE
+            if done:
+                items.pop()
+            if items:
+                depth = stage.queue.qsize() + len(items)
+                stage.max_depth = max(stage.max_depth, depth)
+                logger.debug(f"{stage.name}: queue depth {depth}")
+
+                try:
+                    if stage.batch_size > 1:
+                        out = await stage.handler(items) or []
+                    else:
+                        out = await stage.handler(items[0])
+                        out = [] if out is None else [out]
+                except Exception as e:
+                    for item in items:
+                        if self.on_error:
+                            self.on_error(stage, item, e)
+                    out = []
+                for item in out:
+                    await forward(item)
+
+            if done:
+                return
+
+    async def run(self, items: Iterable) -> list:
+        """Push items through all stages, returns what leaves the last one."""
+        results = []
+        for stage in self.stages:
+            stage.queue = asyncio.Queue(maxsize=stage.queue_size)
+
+        async def collect(item):
+            results.append(item)
+
+        async def feed():
+            first = self.stages[0]
+            for item in items:
+                await first.queue.put(item)
+            for _ in range(first.workers):
+                await first.queue.put(_DONE)
+
+        async def run_stage(index: int, stage: Stage):
+            following = (
+                self.stages[index + 1] if index + 1 < len(self.stages) else None
+            )
+            forward = following.queue.put if following else collect
+            await asyncio.gather(
+                *[self._work(stage, forward) for _ in range(stage.workers)]
+            )
+            if following:
+                for _ in range(following.workers):
+                    await following.queue.put(_DONE)
+
+        await asyncio.gather(
+            feed(), *[run_stage(i, stage) for i, stage in enumerate(self.stages)]
+        )
+        logger.info(
+            "Max queue depths: "
+            + ", ".join(f"{stage.name}={stage.max_depth}" for stage in self.stages)
+        )
+        return results
@@ -0,0 +1,472 @@
+import ast
+import logging
+from pathlib import Path
+from typing import Union
+
+from fastapi_llm_test_generator.schemas import Walker
+from fastapi_llm_test_generator.source import StaticSymbol
+
+from .fastapi_functions import iter_python_files, route_definition
+from .models import model_key
+
+logger = logging.getLogger(__name__)
+
+HTTP_METHODS = {"get", "post", "put", "patch", "delete", "head", "options", "trace"}
+
+Definition = Union[ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef]
+
+
+def attribute_chain(node: ast.AST) -> Union[list[str], None]:
+    """`a.b.c` -> ["a", "b", "c"], None for anything that is not a plain name chain."""
+    chain = []
+    while isinstance(node, ast.Attribute):
+        chain.append(node.attr)
+        node = node.value
+    if not isinstance(node, ast.Name):
+        return None
+    chain.append(node.id)
+    return chain[::-1]
+
+
+def string_value(node: Union[ast.AST, None]) -> Union[str, None]:
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+    return None
+
+
+def keyword_value(call: ast.Call, name: str) -> Union[ast.AST, None]:
+    for keyword in call.keywords:
+        if keyword.arg == name:
+            return keyword.value
+    return None
+
+
+class StaticVariable:
+    """A module level assignment, e.g. `router = APIRouter(...)`."""
+
+    def __init__(self, module: "StaticModule", name: str):
+        self.module = module
+        self.name = name
+
+
+class StaticModule:
+    def __init__(self, name: str, file_path: Path, is_package: bool):
+        self.name = name
+        self.file_path = file_path
+        self.package = name if is_package else name.rpartition(".")[0]
+        self.text = file_path.read_text(encoding="utf-8")
+        self.lines = self.text.splitlines(keepends=True)
+        self.tree = ast.parse(self.text, filename=str(file_path))
+
+        self.definitions: dict[str, Definition] = {}
+        self.assignments: dict[str, ast.AST] = {}
+        # local name -> (module, attribute), attribute is None for `import module`
+        self.imports: dict[str, tuple[str, Union[str, None]]] = {}
+
+        for node in self.tree.body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                self.definitions[node.name] = node
+            elif isinstance(node, ast.Assign):
+                for target in node.targets:
+                    if isinstance(target, ast.Name):
+                        self.assignments[target.id] = node.value
+            elif isinstance(node, ast.AnnAssign) and isinstance(node.target, ast.Name):
+                self.assignments[node.target.id] = node.value
+            elif isinstance(node, ast.Import):
+                for alias in node.names:
+                    if alias.asname:
+                        self.imports[alias.asname] = (alias.name, None)
+                    else:
+                        top = alias.name.split(".")[0]
+                        self.imports[top] = (top, None)
+            elif isinstance(node, ast.ImportFrom):
+                module = self.absolute_module(node.module, node.level)
+                for alias in node.names:
+                    self.imports[alias.asname or alias.name] = (module, alias.name)
+
+    def absolute_module(self, module: Union[str, None], level: int) -> str:
+        if not level:
+            return module
+        parts = self.package.split(".") if self.package else []
+        parts = parts[: len(parts) - (level - 1)] if level > 1 else parts
+        if module:
+            parts.append(module)
+        return ".".join(parts)
+
+    def source(self, node: Definition) -> str:
+        # like inspect.getsource, decorators included
+        start = min([d.lineno for d in node.decorator_list] + [node.lineno])
+        return "".join(self.lines[start - 1 : node.end_lineno])
+
+
+class StaticRoute:
+    """Route-like object (path, methods, name, endpoint) found without running the app."""
+
+    def __init__(
+        self,
+        path: str,
+        methods: set[str],
+        name: str,
+        endpoint: StaticSymbol,
+        index: "ProjectIndex",
+        response_model: ast.AST = None,
+    ):
+        self.path = path
+        self.methods = methods
+        self.name = name
+        self.endpoint = endpoint
+        self.index = index
+        self.response_model = response_model
+
+
+class ProjectIndex:
+    """AST index of all modules of a project, resolving names across imports."""
+
+    def __init__(self, directory: Union[str, Path]):
+        self.directory = Path(directory).resolve()
+        self.modules: dict[str, StaticModule] = {}
+        self.files: dict[Path, StaticModule] = {}
+        self.symbols: dict[int, StaticSymbol] = {}
+
+        # projects importing themselves as a package, e.g. `from myapp.routers import x`
+        package_parts = []
+        parent = self.directory
+        while (parent / "__init__.py").is_file():
+            package_parts.insert(0, parent.name)
+            parent = parent.parent
+
+        for file_path in iter_python_files(self.directory):
+            parts = list(file_path.relative_to(self.directory).with_suffix("").parts)
+            is_package = parts[-1] == "__init__"
+            if is_package:
+                parts = parts[:-1]
+            try:
+                module = StaticModule(".".join(parts), file_path, is_package)
+            except Exception as e:
+                logger.debug(f"Skipping {file_path}: {e}")
+                continue
+            self.modules[module.name] = module
+            self.files[file_path.resolve()] = module
+            if package_parts:
+                self.modules[".".join(package_parts + parts)] = module
+
+    def symbol(
+        self, module: StaticModule, node: Definition, qualname: str = None
+    ) -> StaticSymbol:
+        # one symbol per definition, so they can be used as keys like functions
+        if id(node) not in self.symbols:
+            self.symbols[id(node)] = StaticSymbol(
+                module.name,
+                qualname or node.name,
+                module.file_path,
+                module.source(node),
+                node,
+            )
+        return self.symbols[id(node)]
+
+    def resolve_name(self, module: StaticModule, name: str, seen=None):
+        if name in module.definitions:
+            return self.symbol(module, module.definitions[name])
+        if name in module.assignments:
+            return StaticVariable(module, name)
+        if name not in module.imports:
+            return None
+
+        target, attribute = module.imports[name]
+        if attribute is None:
+            return self.modules.get(target)
+        if f"{target}.{attribute}" in self.modules:
+            return self.modules[f"{target}.{attribute}"]
+        if target in self.modules:
+            # follow re-exports, guarding against import cycles
+            seen = seen or set()
+            if (target, attribute) in seen:
+                return None
+            seen.add((target, attribute))
+            return self.resolve_name(self.modules[target], attribute, seen)
+        return None
+
+    def resolve(self, module: StaticModule, chain: list[str]):
+        resolved = self.resolve_name(module, chain[0])
+        for part in chain[1:]:
+            if isinstance(resolved, StaticModule):
+                submodule = self.modules.get(f"{resolved.name}.{part}")
+                resolved = submodule or self.resolve_name(resolved, part)
+            elif isinstance(resolved, StaticSymbol) and resolved.is_class:
+                method = next(
+                    (
+                        node
+                        for node in resolved.node.body
+                        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))
+                        and node.name == part
+                    ),
+                    None,
+                )
+                if method is None:
+                    return None
+                resolved = self.symbol(
+                    self.modules[resolved.__module__],
+                    method,
+                    f"{resolved.__qualname__}.{part}",
+                )
+            else:
+                return None
+        return resolved
+
+    def is_pydantic_model(self, symbol: StaticSymbol, seen=None) -> bool:
+        if not symbol.is_class:
+            return False
+        seen = seen or set()
+        seen.add(symbol)
+        module = self.modules[symbol.__module__]
+        for base in symbol.node.bases:
+            chain = attribute_chain(base)
+            if not chain:
+                continue
+            resolved = self.resolve(module, chain)
+            if isinstance(resolved, StaticSymbol):
+                if resolved not in seen and self.is_pydantic_model(resolved, seen):
+                    return True
+            elif chain[-1] == "BaseModel":
+                return True
+        return False
+
+    def direct_function_calls(self, symbol: StaticSymbol) -> dict[str, StaticSymbol]:
+        """Static counterpart of walker.direct_function_calls."""
+        module = self.modules[symbol.__module__]
+        function_calls = {}
+        for node in ast.walk(symbol.node):
+            if not isinstance(node, ast.Call):
+                continue
+            chain = attribute_chain(node.func)
+            if not chain:
+                continue
+            resolved = self.resolve(module, chain)
+            if isinstance(resolved, StaticSymbol) and resolved is not symbol:
+                if resolved.is_class and self.is_pydantic_model(resolved):
+                    continue  # Exclude Pydantic models
+                function_calls[ast.unparse(node.func)] = resolved
+        return function_calls
+
+    def annotation_models(self, module: StaticModule, annotation: ast.AST) -> set:
+        models = set()
+        if annotation is None:
+            return models
+        # covers generic arguments like list[Item], Optional[Item], Annotated[Item, ...]
+        stack = [annotation]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, ast.Call):
+                # Annotated metadata, e.g. Field(description="..."), is not a type
+                continue
+            stack.extend(ast.iter_child_nodes(node))
+            if string_value(node):
+                # forward references, "Item" or Optional["Item"]
+                try:
+                    reference = ast.parse(node.value, mode="eval").body
+                except SyntaxError:
+                    continue
+                models |= self.annotation_models(module, reference)
+            elif isinstance(node, (ast.Name, ast.Attribute)):
+                chain = attribute_chain(node)
+                resolved = self.resolve(module, chain) if chain else None
+                if isinstance(resolved, StaticSymbol) and self.is_pydantic_model(
+                    resolved
+                ):
+                    models.add(resolved)
+        return models
+
+    def model_dependencies(self, symbol: StaticSymbol) -> list[StaticSymbol]:
+        """Static counterpart of models.model_dependencies: bases and field types."""
+        module = self.modules[symbol.__module__]
+        dependencies = []
+        for base in symbol.node.bases:
+            # Page[Item] as a base refers to both
+            dependencies += sorted(self.annotation_models(module, base), key=model_key)
+        for node in symbol.node.body:
+            if isinstance(node, ast.AnnAssign):
+                dependencies += sorted(
+                    self.annotation_models(module, node.annotation), key=model_key
+                )
+        return [d for d in dict.fromkeys(dependencies) if d is not symbol]
+
+    def pydantic_models(self, symbol: StaticSymbol, response_model=None) -> set:
+        """Static counterpart of walker.get_pydantic_models_from_function."""
+        models = set()
+        if symbol.is_class:
+            return models
+        module = self.modules[symbol.__module__]
+        arguments = symbol.node.args
+        for arg in arguments.posonlyargs + arguments.args + arguments.kwonlyargs:
+            models |= self.annotation_models(module, arg.annotation)
+        models |= self.annotation_models(module, symbol.node.returns)
+        models |= self.annotation_models(module, response_model)
+        return models
+
+    def routes(
+        self,
+        app_file_path: Path,
+        app_function_name: str = None,
+        app_instance: str = None,
+    ) -> list[StaticRoute]:
+        module = self.files[Path(app_file_path).resolve()]
+        body = module.tree.body
+        if not app_function_name and isinstance(
+            module.definitions.get(app_instance), (ast.FunctionDef, ast.AsyncFunctionDef)
+        ):
+            # an explicit module:attr reference may point to an app factory
+            app_function_name, app_instance = app_instance, None
+        if app_function_name:
+            # create_app(): routes and routers are registered inside the factory
+            factory = module.definitions[app_function_name]
+            body = factory.body
+            for stmt in body:
+                if (
+                    isinstance(stmt, ast.Assign)
+                    and isinstance(stmt.value, ast.Call)
+                    and attribute_chain(stmt.value.func)
+                    in (["FastAPI"], ["fastapi", "FastAPI"])
+                    and isinstance(stmt.targets[0], ast.Name)
+                ):
+                    app_instance = stmt.targets[0].id
+            if app_instance is None:
+                logger.warning(
+                    f"No `app = FastAPI(...)` assignment found in {app_function_name}() of {app_file_path}"
+                )
+                return []
+
+        routes = []
+        self.collect_routes(module, body, app_instance, "", routes, set())
+        if not routes:
+            logger.warning(
+                f"Static discovery found no routes registered on {app_instance} in {app_file_path}"
+            )
+        return routes
+
+    def collect_routes(
+        self,
+        module: StaticModule,
+        body: list[ast.stmt],
+        variable: str,
+        prefix: str,
+        routes: list,
+        seen: set,
+    ):
+        if (module.name, variable) in seen:
+            return
+        seen = seen | {(module.name, variable)}
+
+        # APIRouter(prefix=...) is part of every path registered on the router
+        for stmt in body:
+            if (
+                isinstance(stmt, ast.Assign)
+                and isinstance(stmt.value, ast.Call)
+                and any(
+                    isinstance(t, ast.Name) and t.id == variable for t in stmt.targets
+                )
+            ):
+                prefix += string_value(keyword_value(stmt.value, "prefix")) or ""
+
+        # registration order decides the order of app.routes
+        for stmt in body:
+            if isinstance(stmt, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                for decorator in stmt.decorator_list:
+                    self.add_decorated_route(
+                        module, stmt, decorator, variable, prefix, routes
+                    )
+            elif isinstance(stmt, ast.Expr) and isinstance(stmt.value, ast.Call):
+                call = stmt.value
+                chain = attribute_chain(call.func)
+                if not chain or chain[:-1] != [variable]:
+                    continue
+                if chain[-1] == "include_router" and call.args:
+                    self.include_router(module, call, prefix, routes, seen)
+                elif chain[-1] == "add_api_route" and len(call.args) >= 2:
+                    endpoint = self.resolve(module, attribute_chain(call.args[1]) or [])
+                    if isinstance(endpoint, StaticSymbol):
+                        self.add_route(
+                            routes,
+                            prefix + (string_value(call.args[0]) or ""),
+                            self.route_methods(call, None),
+                            endpoint,
+                            keyword_value(call, "response_model"),
+                        )
+
+    def include_router(self, module, call: ast.Call, prefix: str, routes, seen):
+        include_prefix = string_value(keyword_value(call, "prefix")) or ""
+        chain = attribute_chain(call.args[0])
+        router = self.resolve(module, chain) if chain else None
+        if isinstance(router, StaticVariable):
+            self.collect_routes(
+                router.module,
+                router.module.tree.body,
+                router.name,
+                prefix + include_prefix,
+                routes,
+                seen,
+            )
+        else:
+            logger.debug(f"Could not resolve router {ast.unparse(call.args[0])}")
+
+    def add_decorated_route(self, module, node, decorator, variable, prefix, routes):
+        if not isinstance(decorator, ast.Call):
+            return
+        chain = attribute_chain(decorator.func)
+        if not chain or len(chain) != 2 or chain[0] != variable:
+            return
+        method = chain[1]
+        if method not in HTTP_METHODS and method != "api_route":
+            return
+
+        path = string_value(decorator.args[0] if decorator.args else None)
+        path = path or string_value(keyword_value(decorator, "path")) or ""
+        self.add_route(
+            routes,
+            prefix + path,
+            self.route_methods(decorator, None if method == "api_route" else method),
+            self.symbol(module, node),
+            keyword_value(decorator, "response_model"),
+        )
+
+    def route_methods(self, call: ast.Call, method: Union[str, None]) -> set[str]:
+        if method:
+            return {method.upper()}
+        methods = keyword_value(call, "methods")
+        if isinstance(methods, (ast.List, ast.Tuple, ast.Set)):
+            return {string_value(m).upper() for m in methods.elts if string_value(m)}
+        return {"GET"}
+
+    def add_route(self, routes, path, methods, endpoint, response_model):
+        routes.append(
+            StaticRoute(
+                path=path,
+                methods=methods,
+                name=endpoint.__name__,
+                endpoint=endpoint,
+                index=self,
+                response_model=response_model,
+            )
+        )
+
+
+def inspect_static_route(route: StaticRoute, call_graph) -> Walker:
+    """Static counterpart of walker.inspect_fastapi_route."""
+    func = route.endpoint
+    index = route.index
+
+    pydantic_models = index.pydantic_models(func, route.response_model)
+    # call_graph is a CallGraph resolving edges with index.direct_function_calls
+    function_calls = call_graph.closure(func)
+
+    for name, called in function_calls.items():
+        pydantic_models.update(index.pydantic_models(called))
+    # call_graph.models resolves with index.model_dependencies
+    pydantic_models = set(call_graph.models.closure(pydantic_models))
+
+    return Walker(
+        source_code=func.source,
+        file_path=func.file_path,
+        route_definition=route_definition(route),
+        pydantic_models=pydantic_models,
+        function_calls=function_calls,
+    )
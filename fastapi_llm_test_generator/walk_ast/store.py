@@ -0,0 +1,112 @@
+import logging
+from typing import Any, Callable, Optional
+
+from fastapi_llm_test_generator.schemas import CodeResponse, Walker
+from fastapi_llm_test_generator.source import get_source
+
+logger = logging.getLogger(__name__)
+
+
+class RouteRecord:
+    """A route's context as references into a ContextStore."""
+
+    __slots__ = (
+        "route_definition",
+        "file_path",
+        "source_code",
+        "pydantic_models",
+        "function_calls",
+        "tables",
+        "dependency_tree",
+        "test_results",
+    )
+
+    def __init__(
+        self,
+        route_definition: str,
+        file_path: str,
+        source_code: str,
+        pydantic_models: frozenset,
+        function_calls: tuple,
+        tables: tuple,
+        dependency_tree: Optional[str] = None,
+    ):
+        self.route_definition = route_definition
+        self.file_path = file_path
+        self.source_code = source_code
+        self.pydantic_models = pydantic_models
+        self.function_calls = function_calls  # ((name, func), ...)
+        self.tables = tables  # table names
+        self.dependency_tree = dependency_tree
+        self.test_results = None
+
+
+class ContextStore:
+    """Per-run store of what route contexts share.
+
+    Sources, model sets, call closures and table definitions are kept once
+    and routes only hold a RouteRecord pointing at them, so memory grows with
+    the distinct code of the app rather than with its number of routes.
+    """
+
+    def __init__(self):
+        # canonical instance of every value, looked up by equality
+        self.values: dict[Any, Any] = {}
+        # source per function or model, get_source is not cheap
+        self.sources: dict[Any, str] = {}
+        # table name -> (definition, markdown)
+        self.tables: dict[str, tuple[tuple, str]] = {}
+
+    def intern(self, value):
+        return self.values.setdefault(value, value)
+
+    def source(self, obj: Any) -> str:
+        if obj not in self.sources:
+            self.sources[obj] = self.intern(get_source(obj))
+        return self.sources[obj]
+
+    def add(self, res: Walker) -> RouteRecord:
+        # table_defs and table_markdowns are filled together, in the same order
+        for table, markdown in zip(res.table_defs, res.table_markdowns):
+            if table not in self.tables:
+                self.tables[table] = (res.table_defs[table], self.intern(markdown))
+        return RouteRecord(
+            route_definition=res.route_definition,
+            file_path=self.intern(res.file_path),
+            source_code=self.intern(res.source_code),
+            pydantic_models=self.intern(frozenset(res.pydantic_models or ())),
+            function_calls=self.intern(tuple((res.function_calls or {}).items())),
+            tables=self.intern(tuple(res.table_defs)),
+            dependency_tree=self.intern(res.dependency_tree),
+        )
+
+    def walker(self, record: RouteRecord) -> Walker:
+        # the fields are known to be valid, skip validating (and copying) them
+        return Walker.model_construct(
+            source_code=record.source_code,
+            file_path=record.file_path,
+            route_definition=record.route_definition,
+            pydantic_models=set(record.pydantic_models),
+            function_calls=dict(record.function_calls),
+            table_markdowns=[self.tables[t][1] for t in record.tables],
+            table_defs={t: self.tables[t][0] for t in record.tables},
+            dependency_tree=record.dependency_tree,
+            test_results=record.test_results,
+        )
+
+    def response(self, response: CodeResponse) -> CodeResponse:
+        # the provider's response object duplicates the content and its usage
+        # was read into the CodeResponse already
+        response.response = None
+        return response
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "values": len(self.values),
+            "sources": len(self.sources),
+            "tables": len(self.tables),
+        }
+
+
+def store_source(store: Optional[ContextStore]) -> Callable[[Any], str]:
+    return store.source if store is not None else get_source
@@ -0,0 +1,107 @@
+import inspect
+import sys
+from typing import Any, Callable, Union
+
+# lookups that found nothing, None is a legitimate value of a name
+MISSING = object()
+
+
+class SymbolTable:
+    """Resolves `name` / `a.b.c` chains in one module by lookup.
+
+    Nothing is evaluated: module, class and instance dictionaries are read
+    directly, so properties and other descriptors are never executed.
+    """
+
+    def __init__(self, namespace: dict, symbols: "SymbolTables"):
+        self.namespace = namespace
+        self.symbols = symbols
+        self.resolved: dict[tuple[str, ...], Any] = {}
+
+    def resolve(self, chain: Union[list[str], tuple[str, ...]]) -> Any:
+        """The object a chain refers to, None if it can't be resolved statically."""
+        chain = tuple(chain)
+        if chain not in self.resolved:
+            value = self.namespace.get(chain[0], MISSING)
+            for part in chain[1:]:
+                if value is MISSING:
+                    break
+                value = self.symbols.member(value, part)
+            self.resolved[chain] = None if value is MISSING else value
+        return self.resolved[chain]
+
+
+class SymbolTables:
+    """Run-wide SymbolTable per module, plus the members of every class seen."""
+
+    def __init__(self):
+        self.tables: dict[int, SymbolTable] = {}
+        self.members: dict[type, dict[str, Any]] = {}
+
+    def table(self, func: Callable) -> Union[SymbolTable, None]:
+        namespace = module_namespace(func)
+        if namespace is None:
+            return None
+        # tables keep their namespace alive, so the id can't be reused
+        if id(namespace) not in self.tables:
+            self.tables[id(namespace)] = SymbolTable(namespace, self)
+        return self.tables[id(namespace)]
+
+    def class_members(self, cls: type) -> dict[str, Any]:
+        if cls not in self.members:
+            members = {}
+            for klass in reversed(inspect.getmro(cls)):
+                members.update(vars(klass))
+            self.members[cls] = members
+        return self.members[cls]
+
+    def member(self, obj: Any, name: str) -> Any:
+        if inspect.ismodule(obj):
+            value = vars(obj).get(name, MISSING)
+            if value is MISSING:
+                # submodules that are imported but not bound in the package yet
+                value = sys.modules.get(f"{obj.__name__}.{name}", MISSING)
+            return value
+
+        if inspect.isclass(obj):
+            value = self.class_members(obj).get(name, MISSING)
+        else:
+            instance_dict = getattr(obj, "__dict__", None)
+            value = MISSING
+            if isinstance(instance_dict, dict):
+                value = instance_dict.get(name, MISSING)
+            if value is MISSING:
+                value = self.class_members(type(obj)).get(name, MISSING)
+
+        if isinstance(value, (staticmethod, classmethod)):
+            return value.__func__
+        if isinstance(value, property):
+            # calling the result of a getter, not something we can follow
+            return MISSING
+        return value
+
+
+def call_target(value: Any) -> Any:
+    """The function or class a call of value runs, None if it has no source.
+
+    A callable instance, e.g. `limiter = Limiter()` called as `limiter("x")`,
+    runs its class's __call__. Builtins, partials and the like are skipped.
+    """
+    if inspect.isfunction(value) or inspect.ismethod(value) or inspect.isclass(value):
+        return value
+    if callable(value):
+        call = inspect.getattr_static(type(value), "__call__", None)
+        if inspect.isfunction(call):
+            return call
+    return None
+
+
+def module_namespace(func: Callable) -> Union[dict, None]:
+    """The globals a function's (or class's) names are resolved in."""
+    func = inspect.unwrap(func)
+    func = getattr(func, "__func__", func)  # bound methods
+    namespace = getattr(func, "__globals__", None)
+    if namespace is None:
+        module = sys.modules.get(getattr(func, "__module__", None) or "")
+        namespace = vars(module) if module is not None else None
+    return namespace
@@ -0,0 +1,102 @@
+import fnmatch
+import inspect
+import logging
+import site
+import sys
+import sysconfig
+from pathlib import Path
+from typing import Any, Union
+
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+
+def system_paths() -> list[Path]:
+    """Directories of the standard library and of installed packages."""
+    paths = set()
+    for variables in (None, {"base": sys.base_prefix, "platbase": sys.base_exec_prefix}):
+        scheme = sysconfig.get_paths(vars=variables)
+        for key in ("stdlib", "platstdlib", "purelib", "platlib"):
+            if scheme.get(key):
+                paths.add(scheme[key])
+    # not available in some virtualenv versions
+    if hasattr(site, "getsitepackages"):
+        paths.update(site.getsitepackages())
+    if hasattr(site, "getusersitepackages"):
+        paths.add(site.getusersitepackages())
+    return [Path(path).resolve() for path in paths]
+
+
+class UserCode:
+    """Decides which modules are part of the project whose tests are generated.
+
+    A module is user code when its file is inside root (anywhere outside the
+    standard library and installed packages without a root), a virtual env
+    inside root does not count. include/exclude are globs on module names,
+    e.g. "shared_lib.*", and take precedence, exclude first. Decisions are
+    made once per module name.
+    """
+
+    def __init__(
+        self,
+        root: Union[str, Path] = None,
+        include: list[str] = None,
+        exclude: list[str] = None,
+    ):
+        self.root = Path(root).resolve() if root else None
+        self.include = include or []
+        self.exclude = exclude or []
+        self.system_paths = system_paths()
+        self.modules: dict[str, bool] = {}
+
+    def __call__(self, obj: Any) -> bool:
+        """Check if a function or class belongs to a user-defined module."""
+        if not self.module(getattr(obj, "__module__", None)):
+            return False
+        # pydantic models go into the prompt as models, not as called functions
+        if inspect.isclass(obj) and issubclass(obj, BaseModel):
+            return False
+        owner = getattr(obj, "__qualname__", "").split(".")[0]
+        namespace = getattr(obj, "__globals__", {})
+        if owner in namespace:
+            # methods of pydantic models
+            owner = namespace[owner]
+            if inspect.isclass(owner) and issubclass(owner, BaseModel):
+                return False
+        return True
+
+    def module(self, module_name: Union[str, None]) -> bool:
+        if not isinstance(module_name, str):
+            return False
+        if module_name not in self.modules:
+            self.modules[module_name] = self.classify(module_name)
+        return self.modules[module_name]
+
+    def classify(self, module_name: str) -> bool:
+        if any(fnmatch.fnmatchcase(module_name, glob) for glob in self.exclude):
+            return False
+        if any(fnmatch.fnmatchcase(module_name, glob) for glob in self.include):
+            return True
+
+        top_level = module_name.split(".")[0]
+        if top_level in sys.builtin_module_names or top_level in sys.stdlib_module_names:
+            return False
+
+        file_name = getattr(sys.modules.get(module_name), "__file__", None)
+        if not file_name:
+            # builtin, frozen or namespace packages
+            return False
+        path = Path(file_name).resolve()
+
+        # the most specific directory decides, so that e.g. a .venv inside
+        # root is not user code but a project below a system path is
+        system = max(
+            (len(p.parts) for p in self.system_paths if path.is_relative_to(p)),
+            default=-1,
+        )
+        if self.root is None:
+            return system < 0
+        if not path.is_relative_to(self.root):
+            return False
+        return len(self.root.parts) > system
@@ -1,20 +1,146 @@
+import asyncio
 import logging
-import subprocess
+import re
+import sys
+import tempfile
+from pathlib import Path
+from typing import Union
+from xml.etree import ElementTree
+
+from fastapi_llm_test_generator.schemas import CodeResponse, GeneratedTestResult
 
 logger = logging.getLogger(__name__)
 
 
-def run_test(test_file, test_type: str, test_env: str = None):
+async def ask_ai_client(ai_client_plugin_instance, prompt: str) -> CodeResponse:
+    # async clients are awaited on the loop, blocking ones get a worker thread
+    if getattr(ai_client_plugin_instance, "isAsync", False):
+        return await ai_client_plugin_instance(prompt)
+    return await asyncio.to_thread(ai_client_plugin_instance, prompt)
+
+
+async def stream_ai_client(
+    ai_client_plugin_instance, prompt: str, on_text
+) -> CodeResponse:
+    if getattr(ai_client_plugin_instance, "isAsync", False):
+        return await ai_client_plugin_instance.stream(prompt, on_text)
+    return await asyncio.to_thread(ai_client_plugin_instance.stream, prompt, on_text)
+
+
+async def call_ai_client(ai_client_plugin_instance, method: str, *args):
+    method = getattr(ai_client_plugin_instance, method)
+    if getattr(ai_client_plugin_instance, "isAsync", False):
+        return await method(*args)
+    return await asyncio.to_thread(method, *args)
+
+
+async def iterate_ai_client(ai_client_plugin_instance, method: str, *args):
+    items = getattr(ai_client_plugin_instance, method)(*args)
+    if getattr(ai_client_plugin_instance, "isAsync", False):
+        async for item in items:
+            yield item
+        return
+
+    # pull each item in a thread, blocking iterators may do network requests
+    iterator = iter(items)
+    done = object()
+    while (item := await asyncio.to_thread(next, iterator, done)) is not done:
+        yield item
+
+
+def parse_junit_xml(path: Union[str, Path], rootdir: Path) -> list[GeneratedTestResult]:
+    results = []
+    for case in ElementTree.parse(path).iter("testcase"):
+        outcome, message = "passed", None
+        for child in case:
+            if child.tag in ("failure", "error", "skipped"):
+                outcome = "failed" if child.tag == "failure" else child.tag
+                message = child.get("message")
+                break
+        # collection errors have no file attribute, their name is the path
+        file_path = case.get("file") or case.get("name", "")
+        results.append(
+            GeneratedTestResult(
+                file_path=str((rootdir / file_path).resolve()),
+                name=case.get("name", ""),
+                outcome=outcome,
+                duration=float(case.get("time") or 0),
+                message=message,
+            )
+        )
+    return results
+
+
+def pytest_rootdir(output: str, default: Path) -> Path:
+    """The rootdir pytest reports in its header, JUnit paths are relative to it."""
+    match = re.search(r"^rootdir: (.+?)(?:, \w+: .*)?$", output, re.MULTILINE)
+    return Path(match.group(1)) if match else default
+
+
+async def run_pytest_session(
+    test_files: list[Path], rootdir: Path, test_env: dict = None
+) -> list[GeneratedTestResult]:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        junit_xml = Path(tmp_dir) / "junit.xml"
+        process = await asyncio.create_subprocess_exec(
+            sys.executable,
+            "-m",
+            "pytest",
+            *[str(f) for f in test_files],
+            "-W",
+            "ignore::DeprecationWarning",
+            f"--junitxml={junit_xml}",
+            # xunit1 keeps the file of every test case
+            "-o",
+            "junit_family=xunit1",
+            # no --rootdir: it would also move confcutdir below the project's
+            # own conftest.py files, which the generated tests may rely on
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+            env=test_env,
+        )
+        stdout, _ = await process.communicate()
+        output = stdout.decode(errors="replace")
+        logger.debug(output)
+        if not junit_xml.exists():
+            raise Exception(f"pytest did not report any results:\n{output}")
+        return parse_junit_xml(junit_xml, pytest_rootdir(output, rootdir))
+
+
+async def run_tests(
+    test_files: list[Path],
+    test_type: str,
+    rootdir: Path,
+    workers: int = 1,
+    test_env: dict = None,
+) -> dict[str, list[GeneratedTestResult]]:
+    """Run test files in a few pytest sessions, instead of one process per file.
+
+    Files are sharded over the sessions, results are grouped by file path.
+    """
     if test_type != "pytest":
         raise Exception(f"{test_type} not implemented use: pytest")
+    if not test_files:
+        return {}
 
-    result = subprocess.run(
-        ["pytest", test_file, "-W", "ignore::DeprecationWarning"],
-        capture_output=True,
-        text=True,
-        env=test_env,
+    shards = [test_files[i :: max(workers, 1)] for i in range(max(workers, 1))]
+    sessions = await asyncio.gather(
+        *[
+            run_pytest_session(shard, Path(rootdir), test_env)
+            for shard in shards
+            if shard
+        ]
     )
 
-    logger.info(result.stdout)
-    if result.returncode != 0:
+    results = {str(Path(f).resolve()): [] for f in test_files}
+    for result in (r for session in sessions for r in session):
+        results.setdefault(result.file_path, []).append(result)
+
+    outcomes = [r.outcome for session in sessions for r in session]
+    summary = ", ".join(
+        f"{outcomes.count(o)} {o}" for o in ("passed", "failed", "error", "skipped")
+    )
+    logger.info(f"Ran {len(test_files)} test files: {summary}")
+    if any(o in ("failed", "error") for o in outcomes):
         logger.warning("Tests failed or encountered errors.")
+    return results
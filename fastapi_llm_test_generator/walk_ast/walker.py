@@ -1,161 +1,344 @@
 import ast
+import asyncio
 import inspect
+import json
 import logging
-import sys
+import re
+import textwrap
+import time
 import typing
+from collections import deque
 from pathlib import Path
-from typing import Callable
+from typing import Callable, Union
 
-from pydantic import BaseModel
-
-from fastapi_llm_test_generator.llm import make_prompt
+from fastapi_llm_test_generator.llm import (
+    BatchState,
+    CachedAIClient,
+    ContextPiece,
+    LocalBatchClient,
+    batch_custom_id,
+    ResponseCache,
+    estimate_tokens,
+    fit_context,
+    make_group_prompt,
+    make_prompt,
+    split_group_response,
+    StreamingFileWriter,
+)
 from fastapi_llm_test_generator.plugins.db_clients import (
     async_use_db_plugin,
     use_db_plugin,
 )
-from fastapi_llm_test_generator.schemas import CodeResponse, Walker
+from fastapi_llm_test_generator.schemas import CodeResponse, GeneratedTestResult, Walker
+from fastapi_llm_test_generator.metrics import RunMetrics, timed
 
 from .fastapi_functions import (
     find_fastapi_app,
     load_fastapi_app,
     load_fastapi_module,
+    route_definition,
+)
+from .manifest import Manifest, route_fingerprint
+from .pipeline import Pipeline, Stage
+from .static import ProjectIndex, StaticRoute, attribute_chain, inspect_static_route
+from .store import ContextStore, RouteRecord, store_source
+from .models import ModelGraph, annotation_models, is_pydantic_model
+from .symbols import SymbolTables, call_target
+from .user_code import UserCode
+from .utils import (
+    ask_ai_client,
+    call_ai_client,
+    iterate_ai_client,
+    run_tests as run_test_files,
+    stream_ai_client,
 )
-from .utils import run_test
 
 logger = logging.getLogger(__name__)
 
+# route_context arguments that are not prompt options
+ROUTE_CONTEXT_ARGUMENTS = {
+    "db_plugin_instance",
+    "ai_client_plugin_instance",
+    "manifest",
+    "incremental",
+    "call_graph",
+    "dependency_graph",
+    "metrics",
+    "store",
+}
+# upper bound of generated files run in one pytest session by the verify stage
+VERIFY_BATCH_SIZE = 32
+# classifies without a project root, runs pass their own UserCode
+USER_CODE = UserCode()
+
 
 def get_pydantic_models_from_function(func: Callable, route: Callable = None) -> set:
-    """Extracts all/only Pydantic models used in a function."""
+    """Extracts the Pydantic models in a function's signature and its route's response model.
+
+    Models nested in these are added by ModelGraph.closure.
+    """
     models = set()
-    hints = typing.get_type_hints(func)
-
-    # Get type hints
-    for hint in hints.values():
-        if hasattr(hint, "__origin__"):
-            for arg in hint.__args__:
-                if inspect.isclass(arg) and issubclass(arg, BaseModel):
-                    models.add(arg)
-        elif inspect.isclass(hint) and issubclass(hint, BaseModel):
-            models.add(hint)
-
-    # Get type hints for return type
-    return_type = hints.get("return")
-    if (
-        return_type
-        and inspect.isclass(return_type)
-        and issubclass(return_type, BaseModel)
-    ):
-        models.add(return_type)
+
+    # parameters and return type, through generics like list[dict[str, Model]]
+    for hint in typing.get_type_hints(func).values():
+        models.update(annotation_models(hint))
 
     # Check if route has a response model
     if route and hasattr(route, "response_model"):
-        response_model = route.response_model
-        if hasattr(response_model, "__origin__"):  # Union[Model, List[Model]]
-            for arg in response_model.__args__:
-                if inspect.isclass(arg) and issubclass(arg, BaseModel):
-                    models.add(arg)
-        elif inspect.isclass(response_model) and issubclass(response_model, BaseModel):
-            models.add(response_model)
+        models.update(annotation_models(route.response_model))
 
-    # TODO dependencies ?
+    # Depends(...) parameters are followed by DependencyGraph
 
     return models
 
 
-# TODO Make this better
-def is_user_defined(func_obj: Callable) -> bool:
+def is_user_defined(func_obj: Callable, user_code: UserCode = None) -> bool:
     """Check if the function belongs to a user-defined module."""
-    if not hasattr(func_obj, "__module__"):
-        return False  # Ignore built-in functions
+    return (user_code or USER_CODE)(func_obj)
 
-    module_name = func_obj.__module__
-    if module_name is None:
-        return False
 
-    if module_name in [
-        "__builtin__",
-        "builtins",
-        "sys",
-        "os",
-        "importlib",
-        "collections",
-        "math",
-    ]:
-        return False
+def direct_function_calls(
+    func: Callable, symbols: SymbolTables = None, user_code: UserCode = None
+) -> dict[str, Callable]:
+    """Extract the user defined functions called directly in the function's source code.
 
-    module = sys.modules.get(module_name)
+    Calls are resolved through the symbol table of the function's module,
+    calls on locals or parameters (e.g. `payload.model_dump()`) and anything
+    else that can't be looked up are skipped.
+    """
+    table = (symbols or SymbolTables()).table(func)
+    if table is None:
+        return {}
+    # methods are indented
+    tree = ast.parse(textwrap.dedent(inspect.getsource(func)))
+    function_calls = {}
 
-    if "site-packages" in module.__file__:
-        return False
+    class CallVisitor(ast.NodeVisitor):
+        def visit_Call(self, node):
+            # None for e.g. get_handler()(), calls on call results
+            chain = attribute_chain(node.func)
+            func_obj = call_target(table.resolve(chain)) if chain else None
+            if func_obj is not None and func_obj is not func:
+                if is_user_defined(func_obj, user_code):
+                    function_calls[ast.unparse(node.func)] = func_obj
 
-    if "lib" in module.__file__:
-        return False
+            self.generic_visit(node)
 
-    if ".venv" in module.__file__:
-        return False
+    CallVisitor().visit(tree)
 
-    # Standard library and installed packages are in sys.modules but have __file__ attributes
-    if module and hasattr(module, "__file__"):
-        cls = getattr(func_obj, "__qualname__", "").split(".")[0]
-        if hasattr(func_obj, "__globals__") and cls in func_obj.__globals__:
-            cls_obj = func_obj.__globals__[cls]
-            if inspect.isclass(cls_obj) and issubclass(cls_obj, BaseModel):
-                return False  # Exclude Pydantic models
+    return function_calls
 
-    return True
 
+class CallGraph:
+    """Run-wide cache of call edges, each function's source is parsed only once."""
 
-def walk_tree(func: Callable, visited=None) -> dict[str, Callable]:
-    """Extract all function calls made inside the given function's source code."""
-    if visited is None:
-        visited = set()
+    def __init__(
+        self,
+        resolve: Callable = None,
+        user_code: UserCode = None,
+        models: ModelGraph = None,
+    ):
+        # resolve(func) -> direct calls, the static mode resolves from the AST index
+        self.symbols = SymbolTables()
+        self.user_code = user_code
+        # nested pydantic models, walked along with the calls
+        self.models = models or ModelGraph()
+        self.resolve = resolve or (
+            lambda func: direct_function_calls(func, self.symbols, self.user_code)
+        )
+        self.edges: dict[Callable, dict[str, Callable]] = {}
+        # functions without (parsable) source, left out of closures
+        self.unavailable: set = set()
 
-    if func in visited:
-        return {}
+    def callees(self, func: Callable) -> dict[str, Callable]:
+        if func not in self.edges:
+            try:
+                self.edges[func] = self.resolve(func)
+            except (OSError, TypeError, SyntaxError) as e:
+                # no (parsable) source, e.g. code created at runtime: a leaf
+                logger.debug(f"Could not follow the calls of {func!r}: {e}")
+                self.edges[func] = {}
+                self.unavailable.add(func)
+        return self.edges[func]
 
-    visited.add(func)
+    def closure(self, func: Callable, visited: set = None) -> dict[str, Callable]:
+        """All functions reachable from func, in the order they are first called."""
+        if visited is None:
+            visited = set()
 
-    source_code = inspect.getsource(func)
-    tree = ast.parse(source_code)
-    function_calls = {}
+        function_calls = {}
 
-    class CallVisitor(ast.NodeVisitor):
-        def visit_Call(self, node):
-            if isinstance(node.func, ast.Name):  # Direct function calls
-                func_name = node.func.id
-            elif isinstance(
-                node.func, ast.Attribute
-            ):  # Method calls (e.g., obj.method())
-                func_name = ast.unparse(node.func)
-            else:
-                self.generic_visit(node)
+        def visit(caller):
+            if caller in visited:
                 return
+            visited.add(caller)
+            for name, callee in self.callees(caller).items():
+                # resolved first, so a callee without source is known as such
+                self.callees(callee)
+                if callee not in self.unavailable:
+                    function_calls[name] = callee
+                visit(callee)
+
+        visit(func)
+        return function_calls
+
+    def depths(self, func: Callable) -> dict[Callable, int]:
+        """Shortest call depth of every reachable function, 1 for direct calls."""
+        depths = {}
+        queue = deque([(func, 0)])
+        while queue:
+            caller, depth = queue.popleft()
+            for callee in self.callees(caller).values():
+                if callee is not func and callee not in depths:
+                    depths[callee] = depth + 1
+                    queue.append((callee, depth + 1))
+        return depths
+
+    def dump(self, path: Union[str, Path]):
+        def qualified_name(func):
+            return f"{getattr(func, '__module__', None)}.{getattr(func, '__qualname__', func)}"
+
+        graph = {
+            qualified_name(caller): {
+                name: qualified_name(callee) for name, callee in callees.items()
+            }
+            for caller, callees in self.edges.items()
+        }
+        Path(path).write_text(json.dumps(graph, indent=2, sort_keys=True))
+        logger.info(f"Wrote call graph with {len(graph)} functions to {path}")
+
+
+class DependencyContext:
+    """What one dependency, including its sub-dependencies, adds to a prompt."""
+
+    __slots__ = ("description", "children", "function_calls", "pydantic_models")
+
+    def __init__(self, description: str, children: list[str]):
+        self.description = description
+        self.children = children  # rendered sub-dependency lines
+        self.function_calls: dict[str, Callable] = {}
+        self.pydantic_models: set = set()
+
+
+class DependencyGraph:
+    """Run-wide cache of the Depends(...) tree of routes.
+
+    Every dependency is extracted once per (callable, security scopes), e.g.
+    get_current_user is shared by most routes of an app.
+    """
+
+    def __init__(self, call_graph: CallGraph = None):
+        self.call_graph = call_graph or CallGraph()
+        self.contexts: dict[tuple, DependencyContext] = {}
+
+    def context(self, dependant) -> DependencyContext:
+        if dependant.cache_key not in self.contexts:
+            self.contexts[dependant.cache_key] = self.extract(dependant)
+        return self.contexts[dependant.cache_key]
+
+    def extract(self, dependant) -> DependencyContext:
+        call = dependant.call
+        children = []
+        context = DependencyContext(describe_dependency(dependant), children)
+
+        if inspect.isfunction(call) or inspect.isclass(call):
             try:
-                func_obj = eval(func_name, func.__globals__)  # Get function object
-                if callable(func_obj):
-                    if is_user_defined(func_obj):
-                        # "user" functions
-                        function_calls[func_name] = func_obj
-                        function_calls.update(walk_tree(func_obj, visited))
-                    else:
-                        # external functions
-                        pass
+                if is_user_defined(call, self.call_graph.user_code):
+                    context.function_calls[call.__name__] = call
+                    hinted = call.__init__ if inspect.isclass(call) else call
+                    context.pydantic_models.update(
+                        get_pydantic_models_from_function(hinted)
+                    )
+                    if inspect.isfunction(call):
+                        context.function_calls.update(self.call_graph.closure(call))
             except Exception as e:
-                #logger.debug(f"{e}")
-                raise e
-                pass  # Ignore if function is built-in or unavailable TODO: do this better
+                logger.debug(f"Could not follow dependency {call.__qualname__}: {e}")
+        if is_pydantic_model(call):
+            # e.g. query parameter models, Depends(Filters)
+            context.pydantic_models.add(call)
+        for field in dependant.body_params:
+            context.pydantic_models.update(annotation_models(field.field_info.annotation))
 
-            self.generic_visit(node)
+        for sub_dependant in dependant.dependencies:
+            sub_context = self.context(sub_dependant)
+            children += dependency_lines(sub_dependant, sub_context)
+            context.function_calls.update(sub_context.function_calls)
+            context.pydantic_models.update(sub_context.pydantic_models)
+        return context
 
-    CallVisitor().visit(tree)
+    def route_dependencies(self, route) -> Union[DependencyContext, None]:
+        """The dependencies of a route, None without any."""
+        dependant = getattr(route, "dependant", None)
+        if dependant is None or not dependant.dependencies:
+            return None
+        # the endpoint itself is walked by inspect_fastapi_route
+        lines = []
+        context = DependencyContext("", lines)
+        for sub_dependant in dependant.dependencies:
+            sub_context = self.context(sub_dependant)
+            lines += dependency_lines(sub_dependant, sub_context)
+            context.function_calls.update(sub_context.function_calls)
+            context.pydantic_models.update(sub_context.pydantic_models)
+        return context
 
-    return function_calls
+
+def describe_dependency(dependant) -> str:
+    """`Depends(get_current_user) scopes: items:read; query: skip, limit`"""
+    call = dependant.call
+    if inspect.isfunction(call) or inspect.isclass(call):
+        name = call.__qualname__
+        if inspect.isgeneratorfunction(call) or inspect.isasyncgenfunction(call):
+            name += " (yield)"
+    else:
+        name = type(call).__name__
+    description = f"Depends({name})"
+
+    details = []
+    # scopes are passed down the whole tree, only show them where they are used
+    if dependant.security_scopes and (
+        dependant.security_scopes_param_name or dependant.security_requirements
+    ):
+        details.append(f"scopes: {', '.join(dependant.security_scopes)}")
+    for requirement in dependant.security_requirements:
+        scheme = requirement.security_scheme.model.model_dump(
+            mode="json", exclude_none=True, by_alias=True
+        )
+        details.append(f"security: {json.dumps(scheme, sort_keys=True)}")
+    for kind, fields in (
+        ("path", dependant.path_params),
+        ("query", dependant.query_params),
+        ("header", dependant.header_params),
+        ("cookie", dependant.cookie_params),
+        ("body", dependant.body_params),
+    ):
+        if fields:
+            details.append(f"{kind}: {', '.join(field.alias for field in fields)}")
+    return description + (f" {'; '.join(details)}" if details else "")
+
+
+def dependency_lines(dependant, context: DependencyContext) -> list[str]:
+    head = f"{dependant.name} = " if dependant.name else ""
+    return [f"- {head}{context.description}"] + [
+        f"  {line}" for line in context.children
+    ]
+
+
+def walk_tree(
+    func: Callable, visited=None, call_graph: CallGraph = None
+) -> dict[str, Callable]:
+    """Extract all function calls made inside the given function's source code."""
+    if call_graph is None:
+        call_graph = CallGraph()
+    return call_graph.closure(func, visited)
 
 
-def inspect_fastapi_route(route):
+def inspect_fastapi_route(
+    route, call_graph: CallGraph = None, dependency_graph: DependencyGraph = None
+):
     if hasattr(route, "endpoint") and hasattr(route, "methods"):
         func = route.endpoint
+        if call_graph is None:
+            call_graph = CallGraph()
 
         # 1. get route source code
         source_code = inspect.getsource(func)
@@ -165,20 +348,958 @@ def inspect_fastapi_route(route):
         pydantic_models = get_pydantic_models_from_function(func, route)
 
         # 3. get nested functions
-        function_calls = walk_tree(func)
+        function_calls = walk_tree(func, call_graph=call_graph)
 
         # 4. and their pydantic model definitions
         for name, func in function_calls.items():
             models = get_pydantic_models_from_function(func)
             pydantic_models.update(models)
 
+        # 5. Depends(...) tree, with the sources and models of the dependencies
+        if dependency_graph is None:
+            dependency_graph = DependencyGraph(call_graph)
+        dependencies = dependency_graph.route_dependencies(route)
+        if dependencies is not None:
+            for name, func in dependencies.function_calls.items():
+                function_calls.setdefault(name, func)
+            pydantic_models.update(dependencies.pydantic_models)
+
+        # 6. models nested in all of these
+        pydantic_models = set(call_graph.models.closure(pydantic_models))
+
         return Walker(
             source_code=source_code,
             file_path=file_path,
-            route_definition=f"{route.path}_{route.methods}",
+            route_definition=route_definition(route),
             pydantic_models=pydantic_models,
             function_calls=function_calls,
+            dependency_tree="\n".join(dependencies.children) if dependencies else None,
+        )
+
+
+def route_test_file(test_directory: Path, route) -> Path:
+    route_parts = route.path.strip("/").split("/")
+    method_suffix = "_".join(sorted(route.methods)).upper()
+    directory = test_directory / Path(*route_parts)
+    return directory / f"test_{'_'.join(route_parts)}_{method_suffix}.py"
+
+
+def build_prompt(
+    route,
+    res: Walker,
+    call_graph: CallGraph,
+    max_prompt_tokens: int = None,
+    prompt_type: str = None,
+    store: ContextStore = None,
+    **prompt_kwargs,
+) -> str:
+    source_of = store_source(store)
+    # dependencies first, otherwise sorted, so identical inputs give
+    # byte-identical prompts across runs
+    models = (call_graph or CallGraph()).models.closure(
+        m for m in res.pydantic_models or [] if m
+    )
+    # sorted as well, so routes sharing helpers share a longer cacheable prefix
+    functions = dict(
+        sorted(
+            (res.function_calls or {}).items(),
+            key=lambda item: (
+                getattr(item[1], "__module__", ""),
+                getattr(item[1], "__qualname__", item[0]),
+            ),
+        )
+    )
+    db_prompt = "\n".join(res.table_markdowns) + "\n" if res.table_markdowns else None
+
+    if max_prompt_tokens:
+        if isinstance(route, StaticRoute):
+            signature_models = route.index.pydantic_models(
+                route.endpoint, route.response_model
+            )
+        else:
+            signature_models = get_pydantic_models_from_function(route.endpoint, route)
+        depths = call_graph.depths(route.endpoint)
+
+        # rank: models in the signature, then by call depth, table users first
+        pieces = [
+            ContextPiece(
+                "model", m.__name__, source_of(m), 3 if m in signature_models else 1
+            )
+            for m in models
+        ]
+        for name, func in functions.items():
+            source = source_of(func)
+            score = 2 / depths.get(func, 2)
+            if any(re.search(rf"\b{re.escape(t)}\b", source) for t in res.table_defs):
+                score += 0.5
+            pieces.append(ContextPiece("function", name, source, score))
+
+        # everything but the ranked context, including the empty context sections
+        base_tokens = estimate_tokens(
+            make_prompt(
+                url=route.path,
+                pydantic_prompt=" ",
+                function_prompt=" ",
+                db_prompt=db_prompt,
+                code_prompt=res.source_code,
+                dependency_prompt=res.dependency_tree,
+                prompt_type=prompt_type,
+                **prompt_kwargs,
+            )
+        )
+        pieces = fit_context(pieces, max_prompt_tokens - base_tokens)
+        model_sources = [p.text for p in pieces if p.kind == "model"]
+        function_sources = [p.text + "\n" for p in pieces if p.kind == "function"]
+    else:
+        model_sources = [source_of(m) for m in models]
+        function_sources = [source_of(f) + "\n" for f in functions.values()]
+
+    prompt = make_prompt(
+        url=route.path,
+        pydantic_prompt="".join(model_sources) if model_sources else None,
+        function_prompt="".join(function_sources) if function_sources else None,
+        db_prompt=db_prompt,
+        code_prompt=res.source_code,
+        dependency_prompt=res.dependency_tree,
+        prompt_type=prompt_type,
+        **prompt_kwargs,
+    )
+    logger.info(f"Prompt for '{route.path}': ~{estimate_tokens(prompt)} tokens")
+    return prompt
+
+
+async def route_context(
+    route,
+    file_name: Path,
+    db_plugin_instance=None,
+    ai_client_plugin_instance=None,
+    prompt_type: str = None,
+    manifest: Manifest = None,
+    incremental: bool = False,
+    call_graph: CallGraph = None,
+    dependency_graph: DependencyGraph = None,
+    metrics: RunMetrics = None,
+    store: ContextStore = None,
+    max_prompt_tokens: int = None,
+    **prompt_kwargs,
+) -> Union[tuple[Walker, str], None]:
+    definition = route_definition(route)
+
+    # 1. get all necessary codes, models, definitions
+    with timed(metrics, "walk", definition):
+        if isinstance(route, StaticRoute):
+            res = inspect_static_route(route, call_graph)
+        else:
+            res = inspect_fastapi_route(route, call_graph, dependency_graph)
+
+    # 2. extract necessary tables
+    with timed(metrics, "db", definition):
+        if db_plugin_instance and db_plugin_instance.isAsync:
+            res = await async_use_db_plugin(db_plugin_instance, res)
+        elif db_plugin_instance:
+            res = await asyncio.to_thread(use_db_plugin, db_plugin_instance, res)
+        else:
+            logger.debug("Not using db_plugin")
+
+    # 3. compare against the inputs of the last generation
+    fingerprint = None
+    if manifest is not None:
+        if max_prompt_tokens:
+            # only when set, so fingerprints of runs without a budget stay valid
+            prompt_kwargs["max_prompt_tokens"] = max_prompt_tokens
+        fingerprint = route_fingerprint(
+            res,
+            source=store_source(store),
+            model=getattr(ai_client_plugin_instance, "model", None),
+            prompt_type=prompt_type,
+            **prompt_kwargs,
+        )
+        if (
+            incremental
+            and file_name.exists()
+            and manifest.get(res.route_definition) == fingerprint
+        ):
+            logger.info(f"Skipping test '{file_name}' inputs are unchanged")
+            return None
+
+    return res, fingerprint
+
+
+async def prepare_route(
+    route,
+    file_name: Path,
+    call_graph: CallGraph = None,
+    max_prompt_tokens: int = None,
+    prompt_type: str = None,
+    **kwargs,
+) -> Union[tuple[Walker, str, str], None]:
+    context = await route_context(
+        route,
+        file_name,
+        call_graph=call_graph,
+        prompt_type=prompt_type,
+        max_prompt_tokens=max_prompt_tokens,
+        **kwargs,
+    )
+    if context is None:
+        return None
+    res, fingerprint = context
+
+    # 4. create prompt
+    prompt_kwargs = {
+        k: v for k, v in kwargs.items() if k not in ROUTE_CONTEXT_ARGUMENTS
+    }
+    with timed(kwargs.get("metrics"), "prompt", res.route_definition):
+        prompt = build_prompt(
+            route,
+            res,
+            call_graph,
+            max_prompt_tokens=max_prompt_tokens,
+            prompt_type=prompt_type,
+            store=kwargs.get("store"),
+            **prompt_kwargs,
+        )
+    logger.debug(prompt)
+
+    return res, prompt, fingerprint
+
+
+async def ask_route(
+    route,
+    prompt: str,
+    file_name: Path,
+    ai_client_plugin_instance=None,
+    stream: bool = False,
+    progress: Callable = None,
+) -> tuple[CodeResponse, bool]:
+    """5. ask llm, returns the response and whether it was streamed to file_name."""
+    if progress:
+        progress(route_definition(route), "waiting")
+
+    if not (stream and hasattr(ai_client_plugin_instance, "stream")):
+        return await ask_ai_client(ai_client_plugin_instance, prompt), False
+
+    writer = StreamingFileWriter(file_name)
+
+    def on_text(text: str):
+        writer.write(text)
+        if progress:
+            progress(route_definition(route), "streaming", writer.received)
+
+    try:
+        response = await stream_ai_client(ai_client_plugin_instance, prompt, on_text)
+    except BaseException:
+        writer.abort()
+        raise
+    writer.commit()
+    logger.debug(f"Streamed test to file: {file_name}")
+    return response, True
+
+
+async def finish_route(
+    res: Union[Walker, RouteRecord],
+    response: CodeResponse,
+    file_name: Path,
+    manifest: Manifest = None,
+    fingerprint: str = None,
+    written: bool = False,
+):
+    # streamed responses are already in place
+    if not written:
+        file_name.parent.mkdir(parents=True, exist_ok=True)
+        with open(file_name, "w") as f:
+            f.write(response.content)
+        logger.debug(f"Writing test to file: {file_name}")
+    if manifest is not None:
+        manifest.set(res.route_definition, fingerprint)
+
+
+async def verify_routes(
+    results: list[tuple[Union[Walker, RouteRecord], CodeResponse, Path]],
+    prompt_type: str,
+    test_directory: Path,
+    workers: int = 1,
+    metrics: RunMetrics = None,
+):
+    """6. run the test files of results, attaching the per-test results."""
+    if not results:
+        return
+    error = None
+    with timed(metrics, "test_sessions"):
+        try:
+            test_results = await run_test_files(
+                [file_name for _, _, file_name in results],
+                prompt_type,
+                test_directory,
+                workers=workers,
+            )
+        except Exception as e:
+            # the files are already written, so a broken session only
+            # costs the test results, not the generated routes
+            logger.error(f"Running the tests of {len(results)} files failed: {e}")
+            test_results, error = {}, str(e)
+    for res, _, file_name in results:
+        file_path = str(file_name.resolve())
+        res.test_results = test_results.get(file_path, [])
+        if error is not None:
+            res.test_results = [
+                GeneratedTestResult(
+                    file_path=file_path,
+                    name=file_name.stem,
+                    outcome="error",
+                    message=error,
+                )
+            ]
+        if metrics is not None:
+            metrics.add(
+                "test",
+                sum(result.duration for result in res.test_results),
+                res.route_definition,
+            )
+
+
+class RouteJob:
+    """One route moving through the generation pipeline."""
+
+    __slots__ = (
+        "index",
+        "route",
+        "file_name",
+        "res",
+        "fingerprint",
+        "prompt",
+        "response",
+        "written",
+    )
+
+    def __init__(self, index: int, route, file_name: Path):
+        self.index = index
+        self.route = route
+        self.file_name = file_name
+        self.res = None
+        self.fingerprint = None
+        self.prompt = None
+        self.response = None
+        self.written = False
+
+
+async def generate_routes_pipeline(
+    filtered_routes: list,
+    test_directory: Path,
+    skip: Callable,
+    stage_workers: dict[str, int],
+    ai_client_plugin_instance=None,
+    call_graph: CallGraph = None,
+    max_prompt_tokens: int = None,
+    stream: bool = False,
+    progress: Callable = None,
+    run_tests: bool = False,
+    **kwargs,
+) -> tuple[list[tuple[Walker, CodeResponse]], int]:
+    """context -> prompt -> llm -> write -> verify, each stage with its own workers.
+
+    Bounded queues between the stages keep e.g. test runs of finished routes
+    overlapping with the LLM calls of the next ones. Jobs hold their context
+    as a RouteRecord of the run's ContextStore.
+    Returns the results in route order and the number of failed routes.
+    """
+    failed = []
+    metrics = kwargs.get("metrics")
+    store = kwargs["store"]
+    prompt_kwargs = {
+        k: v for k, v in kwargs.items() if k not in ROUTE_CONTEXT_ARGUMENTS
+    }
+
+    async def context(job: RouteJob):
+        if skip(job.route):
+            return None
+        context = await route_context(
+            job.route,
+            job.file_name,
+            ai_client_plugin_instance=ai_client_plugin_instance,
+            call_graph=call_graph,
+            max_prompt_tokens=max_prompt_tokens,
+            **kwargs,
+        )
+        if context is None:
+            return None
+        res, job.fingerprint = context
+        job.res = store.add(res)
+        return job
+
+    async def prompt(job: RouteJob):
+        with timed(metrics, "prompt", job.res.route_definition):
+            job.prompt = build_prompt(
+                job.route,
+                store.walker(job.res),
+                call_graph,
+                max_prompt_tokens=max_prompt_tokens,
+                store=store,
+                **prompt_kwargs,
+            )
+        logger.debug(job.prompt)
+        return job
+
+    async def llm(job: RouteJob):
+        with timed(metrics, "llm", job.res.route_definition):
+            job.response, job.written = await ask_route(
+                job.route,
+                job.prompt,
+                job.file_name,
+                ai_client_plugin_instance,
+                stream=stream,
+                progress=progress,
+            )
+        if metrics is not None:
+            metrics.record_response(job.res.route_definition, job.response)
+        store.response(job.response)
+        job.prompt = None
+        return job
+
+    async def write(job: RouteJob):
+        with timed(metrics, "write", job.res.route_definition):
+            await finish_route(
+                job.res,
+                job.response,
+                job.file_name,
+                manifest=kwargs.get("manifest"),
+                fingerprint=job.fingerprint,
+                written=job.written,
+            )
+        if progress:
+            progress(route_definition(job.route), "done")
+        return job
+
+    async def verify(jobs: list[RouteJob]):
+        # files that queued up while pytest was busy share the next session
+        await verify_routes(
+            [(job.res, job.response, job.file_name) for job in jobs],
+            kwargs.get("prompt_type"),
+            test_directory,
+            metrics=metrics,
+        )
+        return jobs
+
+    def on_error(stage: Stage, job: RouteJob, e: Exception):
+        logger.error(f"Generating tests for '{job.route.path}' failed: {e}")
+        if progress:
+            progress(route_definition(job.route), "failed")
+        failed.append(job)
+
+    stages = [
+        Stage("context", context, stage_workers["context"]),
+        Stage("prompt", prompt, stage_workers["prompt"]),
+        Stage("llm", llm, stage_workers["llm"]),
+        Stage("write", write, stage_workers["write"]),
+    ]
+    if run_tests:
+        stages.append(
+            Stage(
+                "verify",
+                verify,
+                stage_workers["verify"],
+                batch_size=VERIFY_BATCH_SIZE,
+                queue_size=VERIFY_BATCH_SIZE,
+            )
+        )
+
+    jobs = await Pipeline(stages, on_error=on_error).run(
+        RouteJob(index, route, route_test_file(test_directory, route))
+        for index, route in enumerate(filtered_routes)
+    )
+    # jobs finish in any order, return them in route order
+    jobs.sort(key=lambda job: job.index)
+    return [(store.walker(job.res), job.response) for job in jobs], len(failed)
+
+
+def route_group_key(route, group_by: str) -> str:
+    if group_by == "module":
+        # the module of the endpoint, usually the file of its APIRouter
+        return route.endpoint.__module__
+    if group_by == "prefix":
+        # the path up to its first parameter, or the parent of a path without
+        # parameters: /items, /items/{id} and /items/{id}/tags share /items
+        segments = route.path.strip("/").split("/")
+        static = []
+        for segment in segments:
+            if segment.startswith("{"):
+                break
+            static.append(segment)
+        if len(static) == len(segments) and len(static) > 1:
+            static.pop()
+        return "/" + "/".join(static)
+    raise Exception(f"group_by: {group_by} not supported, use module or prefix")
+
+
+def build_group_prompt(
+    jobs: list[RouteJob],
+    store: ContextStore,
+    call_graph: CallGraph = None,
+    prompt_type: str = None,
+    **prompt_kwargs,
+) -> str:
+    """One prompt for all routes of a group, their context deduplicated."""
+    models, functions, tables = set(), {}, {}
+    for job in jobs:
+        models.update(model for model in job.res.pydantic_models if model)
+        for name, func in job.res.function_calls:
+            key = (getattr(func, "__module__", ""), getattr(func, "__qualname__", name))
+            functions[key] = func
+        for table in job.res.tables:
+            tables[table] = store.tables[table][1]
+
+    model_sources = [
+        store.source(model)
+        for model in (call_graph or CallGraph()).models.closure(models)
+    ]
+    function_sources = [
+        store.source(functions[key]) + "\n" for key in sorted(functions)
+    ]
+    prompt = make_group_prompt(
+        [
+            (
+                job.route.path,
+                sorted(job.route.methods),
+                job.res.source_code,
+                job.res.dependency_tree,
+            )
+            for job in jobs
+        ],
+        pydantic_prompt="".join(model_sources) if model_sources else None,
+        function_prompt="".join(function_sources) if function_sources else None,
+        db_prompt="\n".join(tables[t] for t in sorted(tables)) + "\n"
+        if tables
+        else None,
+        prompt_type=prompt_type,
+        **prompt_kwargs,
+    )
+    logger.info(
+        f"Prompt for {len(jobs)} routes: ~{estimate_tokens(prompt)} tokens"
+    )
+    return prompt
+
+
+class GroupJob:
+    """Routes generated with one prompt."""
+
+    __slots__ = ("key", "jobs", "prompt", "response")
+
+    def __init__(self, key: str, jobs: list[RouteJob]):
+        self.key = key
+        self.jobs = jobs
+        self.prompt = None
+        self.response = None
+
+
+async def generate_routes_grouped(
+    filtered_routes: list,
+    test_directory: Path,
+    skip: Callable,
+    stage_workers: dict[str, int],
+    group_by: str,
+    group_size: int = 8,
+    ai_client_plugin_instance=None,
+    call_graph: CallGraph = None,
+    max_prompt_tokens: int = None,
+    stream: bool = False,
+    progress: Callable = None,
+    run_tests: bool = False,
+    **kwargs,
+) -> tuple[list[tuple[Walker, CodeResponse]], int]:
+    """Like generate_routes_pipeline, with one prompt per group of routes.
+
+    Contexts are collected for all routes first, then routes are grouped by
+    group_by into chunks of at most group_size, which go through
+    prompt -> llm -> write -> verify. The response of a group is split back
+    into one test file per route.
+    """
+    failed = []
+    metrics = kwargs.get("metrics")
+    store = kwargs["store"]
+    prompt_kwargs = {
+        k: v for k, v in kwargs.items() if k not in ROUTE_CONTEXT_ARGUMENTS
+    }
+    semaphore = asyncio.Semaphore(stage_workers["context"])
+
+    async def context(job: RouteJob):
+        if skip(job.route):
+            return None
+        async with semaphore:
+            try:
+                context = await route_context(
+                    job.route,
+                    job.file_name,
+                    ai_client_plugin_instance=ai_client_plugin_instance,
+                    call_graph=call_graph,
+                    **kwargs,
+                )
+            except Exception as e:
+                logger.error(f"Generating tests for '{job.route.path}' failed: {e}")
+                failed.append(job)
+                return None
+        if context is None:
+            return None
+        res, job.fingerprint = context
+        job.res = store.add(res)
+        return job
+
+    jobs = await asyncio.gather(
+        *[
+            context(RouteJob(index, route, route_test_file(test_directory, route)))
+            for index, route in enumerate(filtered_routes)
+        ]
+    )
+    grouped = {}
+    for job in jobs:
+        if job is not None:
+            grouped.setdefault(route_group_key(job.route, group_by), []).append(job)
+    group_size = max(group_size, 1)
+    groups = []
+    for key, group in grouped.items():
+        chunks = [group[i : i + group_size] for i in range(0, len(group), group_size)]
+        for number, chunk in enumerate(chunks, start=1):
+            # the key names the group in logs and in the progress display
+            name = f"{key} ({number}/{len(chunks)})" if len(chunks) > 1 else key
+            groups.append(GroupJob(name, chunk))
+    if max_prompt_tokens:
+        logger.warning(
+            "--max-prompt-tokens is ignored with --group-by, grouped prompts are not trimmed"
+        )
+    if stream:
+        logger.warning(
+            "--stream is ignored with --group-by, grouped responses are split after they arrive"
+        )
+
+    async def prompt(group: GroupJob):
+        with timed(metrics, "prompt_groups"):
+            group.prompt = build_group_prompt(
+                group.jobs, store, call_graph, **prompt_kwargs
+            )
+        logger.debug(group.prompt)
+        return group
+
+    async def llm(group: GroupJob):
+        if progress:
+            progress(group.key, "waiting")
+        start = time.perf_counter()
+        group.response = await ask_ai_client(ai_client_plugin_instance, group.prompt)
+        group.prompt = None
+        if metrics is not None:
+            # the group's time is shared by its routes, its tokens are counted
+            # once (on the first route) so the totals stay exact
+            seconds = (time.perf_counter() - start) / len(group.jobs)
+            for job in group.jobs:
+                metrics.add("llm", seconds, job.res.route_definition)
+            metrics.record_response(group.jobs[0].res.route_definition, group.response)
+        store.response(group.response)
+        return group
+
+    async def write(group: GroupJob):
+        modules = split_group_response(group.response.content, len(group.jobs))
+        written = []
+        for number, job in enumerate(group.jobs, start=1):
+            if number not in modules:
+                logger.error(
+                    f"Generating tests for '{job.route.path}' failed: no tests for it in the response of group '{group.key}'"
+                )
+                failed.append(job)
+                continue
+            job.response = group.response.model_copy(
+                update={"content": modules[number]}
+            )
+            with timed(metrics, "write", job.res.route_definition):
+                await finish_route(
+                    job.res,
+                    job.response,
+                    job.file_name,
+                    manifest=kwargs.get("manifest"),
+                    fingerprint=job.fingerprint,
+                )
+            written.append(job)
+        if progress:
+            progress(group.key, "done")
+        group.jobs = written
+        return group
+
+    async def verify(groups: list[GroupJob]):
+        await verify_routes(
+            [(job.res, job.response, job.file_name) for g in groups for job in g.jobs],
+            kwargs.get("prompt_type"),
+            test_directory,
+            metrics=metrics,
+        )
+        return groups
+
+    def on_error(stage: Stage, group: GroupJob, e: Exception):
+        logger.error(f"Generating tests for group '{group.key}' failed: {e}")
+        if progress:
+            progress(group.key, "failed")
+        failed.extend(group.jobs)
+
+    stages = [
+        Stage("prompt", prompt, stage_workers["prompt"]),
+        Stage("llm", llm, stage_workers["llm"]),
+        Stage("write", write, stage_workers["write"]),
+    ]
+    if run_tests:
+        stages.append(
+            Stage(
+                "verify",
+                verify,
+                stage_workers["verify"],
+                batch_size=VERIFY_BATCH_SIZE,
+                queue_size=VERIFY_BATCH_SIZE,
+            )
+        )
+
+    logger.info(f"Generating {len(jobs)} routes in {len(groups)} groups")
+    groups = await Pipeline(stages, on_error=on_error).run(groups)
+    jobs = sorted((job for group in groups for job in group.jobs), key=lambda j: j.index)
+    return [(store.walker(job.res), job.response) for job in jobs], len(failed)
+
+
+async def generate_routes_batch(
+    filtered_routes: list,
+    test_directory: Path,
+    prepare: Callable,
+    ai_client_plugin_instance=None,
+    batch_poll_interval: float = 60,
+    **kwargs,
+) -> list:
+    """Build all prompts, submit them as one batch, write tests from the results."""
+    state = BatchState(test_directory)
+    store = kwargs["store"]
+    routes_by_definition = {}
+
+    if state.batch_id:
+        logger.info(f"Resuming batch {state.batch_id}")
+        # only the route contexts are rebuilt, the prompts were submitted already
+        pending = {entry["route_definition"] for entry in state.routes.values()}
+        for route in filtered_routes:
+            if route_definition(route) not in pending:
+                continue
+            try:
+                # submitted routes are awaited regardless of the incremental check
+                context = await route_context(
+                    route,
+                    route_test_file(test_directory, route),
+                    ai_client_plugin_instance=ai_client_plugin_instance,
+                    **{**kwargs, "incremental": False},
+                )
+            except Exception as e:
+                logger.error(f"Generating tests for '{route.path}' failed: {e}")
+                continue
+            if context is not None:
+                routes_by_definition[context[0].route_definition] = store.add(
+                    context[0]
+                )
+    else:
+        prepared_routes = await asyncio.gather(
+            *[prepare(index, route) for index, route in enumerate(filtered_routes)]
         )
+        prompts = {}
+        for route, prepared in zip(filtered_routes, prepared_routes):
+            if prepared is None or isinstance(prepared, Exception):
+                continue
+            res, prompt, fingerprint = prepared
+            custom_id = batch_custom_id(res.route_definition)
+            prompts[custom_id] = prompt
+            routes_by_definition[res.route_definition] = store.add(res)
+            state.routes[custom_id] = {
+                "route_definition": res.route_definition,
+                "file_name": str(route_test_file(test_directory, route)),
+                "fingerprint": fingerprint,
+            }
+        if not prompts:
+            return []
+
+        state.batch_id = await call_ai_client(
+            ai_client_plugin_instance, "submit_batch", prompts
+        )
+        state.save()
+        logger.info(f"Submitted batch {state.batch_id} with {len(prompts)} prompts")
+
+    metrics = kwargs.get("metrics")
+    # the provider works on the batch as a whole, so llm time is run-wide here
+    with timed(metrics, "llm_batch"):
+        while not await call_ai_client(
+            ai_client_plugin_instance, "poll_batch", state.batch_id
+        ):
+            logger.debug(f"Batch {state.batch_id} still in progress")
+            await asyncio.sleep(batch_poll_interval)
+
+    results = []
+    async for custom_id, response in iterate_ai_client(
+        ai_client_plugin_instance, "batch_results", state.batch_id
+    ):
+        entry = state.routes.get(custom_id)
+        if entry is None:
+            continue
+        if response.status != "success":
+            logger.error(
+                f"Generating tests for '{entry['route_definition']}' failed: {response.status}"
+            )
+            continue
+        record = routes_by_definition.get(entry["route_definition"])
+        if record is None:
+            # removed or renamed since the batch was submitted
+            logger.warning(
+                f"Skipping batch result of '{entry['route_definition']}', no such route"
+            )
+            continue
+        res = store.walker(record)
+        if metrics is not None:
+            metrics.record_response(entry["route_definition"], response)
+        store.response(response)
+        with timed(metrics, "write", entry["route_definition"]):
+            await finish_route(
+                res,
+                response,
+                Path(entry["file_name"]),
+                manifest=kwargs.get("manifest"),
+                fingerprint=entry["fingerprint"],
+            )
+        results.append((res, response))
+
+    state.clear()
+    # results arrive in any order, return them in route order
+    order = {route_definition(route): i for i, route in enumerate(filtered_routes)}
+    return sorted(results, key=lambda r: order.get(r[0].route_definition, 0))
+
+
+async def generate_routes(
+    filtered_routes: list,
+    test_directory: Path,
+    overwrite: bool = False,
+    concurrency: int = 1,
+    incremental: bool = False,
+    batch: bool = False,
+    batch_poll_interval: float = 60,
+    stream: bool = False,
+    progress: Callable = None,
+    run_tests: bool = False,
+    test_workers: int = 1,
+    stage_workers: dict[str, int] = None,
+    group_by: str = None,
+    group_size: int = 8,
+    **kwargs,
+) -> list[tuple[Walker, CodeResponse]]:
+    if batch and group_by:
+        raise Exception("Batch mode can't be combined with grouping routes")
+    if kwargs.get("store") is None:
+        kwargs["store"] = ContextStore()
+
+    workers = {
+        "context": concurrency,
+        "prompt": 1,
+        "llm": concurrency,
+        "write": 1,
+        "verify": test_workers,
+    }
+    workers.update(stage_workers or {})
+
+    def skip(route) -> bool:
+        file_name = route_test_file(test_directory, route)
+        # incremental runs decide per route after fingerprinting its inputs
+        if file_name.exists() and not overwrite and not incremental:
+            logger.info(f"Skipping test '{file_name}' already exists")
+            return True
+        return False
+
+    # plugins hold their connections for the whole run, on this one event loop,
+    # open/close are coroutines only for async plugins that override them
+    db_plugin_instance = kwargs.get("db_plugin_instance")
+    if db_plugin_instance:
+        opened = db_plugin_instance.open()
+        if inspect.isawaitable(opened):
+            await opened
+
+    try:
+        if batch:
+            semaphore = asyncio.Semaphore(workers["context"])
+
+            async def prepare(index, route):
+                if skip(route):
+                    return None
+                async with semaphore:
+                    logger.debug(f"{index}/{len(filtered_routes)}")
+                    try:
+                        return await prepare_route(
+                            route,
+                            route_test_file(test_directory, route),
+                            incremental=incremental,
+                            **kwargs,
+                        )
+                    except Exception as e:
+                        logger.error(
+                            f"Generating tests for '{route.path}' failed: {e}"
+                        )
+                        return e
+
+            results = await generate_routes_batch(
+                filtered_routes,
+                test_directory,
+                prepare,
+                batch_poll_interval=batch_poll_interval,
+                **kwargs,
+            )
+            failed = 0
+            if run_tests and results:
+                files = {
+                    route_definition(route): route_test_file(
+                        test_directory, route
+                    )
+                    for route in filtered_routes
+                }
+                await verify_routes(
+                    [
+                        (res, response, files[res.route_definition])
+                        for res, response in results
+                    ],
+                    kwargs.get("prompt_type"),
+                    test_directory,
+                    workers=workers["verify"],
+                    metrics=kwargs.get("metrics"),
+                )
+        elif group_by:
+            results, failed = await generate_routes_grouped(
+                filtered_routes,
+                test_directory,
+                skip,
+                workers,
+                group_by,
+                group_size=group_size,
+                stream=stream,
+                progress=progress,
+                run_tests=run_tests,
+                incremental=incremental,
+                **kwargs,
+            )
+        else:
+            results, failed = await generate_routes_pipeline(
+                filtered_routes,
+                test_directory,
+                skip,
+                workers,
+                stream=stream,
+                progress=progress,
+                run_tests=run_tests,
+                incremental=incremental,
+                **kwargs,
+            )
+    finally:
+        ai_client_plugin_instance = kwargs.get("ai_client_plugin_instance")
+        if hasattr(ai_client_plugin_instance, "aclose"):
+            await ai_client_plugin_instance.aclose()
+
+        if db_plugin_instance:
+            closed = db_plugin_instance.close()
+            if inspect.isawaitable(closed):
+                await closed
+
+    if failed:
+        logger.warning(f"{failed}/{len(filtered_routes)} routes failed")
+    return results
 
 
 def walker(
@@ -196,30 +1317,64 @@ def walker(
     prompt_type: str = None,
     overwrite: bool = False,
     run_tests: bool = False,
+    concurrency: int = 1,
+    response_cache: ResponseCache = None,
+    incremental: bool = False,
+    app_reference: str = None,
+    call_graph_dump: Union[str, Path] = None,
+    static: bool = False,
+    max_prompt_tokens: int = None,
+    batch: bool = False,
+    batch_poll_interval: float = 60,
+    stream: bool = False,
+    progress: Callable = None,
+    test_workers: int = 1,
+    stage_workers: dict[str, int] = None,
+    metrics: RunMetrics = None,
+    group_by: str = None,
+    group_size: int = 8,
+    include_modules: list[str] = None,
+    exclude_modules: list[str] = None,
 ) -> list[tuple[Walker, CodeResponse]]:
-    app_file_path, app_function_name, app_instance = find_fastapi_app(
-        source_app_directory
-    )
+    with timed(metrics, "discovery"):
+        app_file_path, app_function_name, app_instance = find_fastapi_app(
+            source_app_directory, app_reference
+        )
     if not app_file_path:
         raise Exception("No FastAPI app found.")
 
-    if db_plugin_instance and db_plugin_instance.isAsync:
-        import asyncio
-
-    # try:
-    module, spec = load_fastapi_module(app_file_path)
-    routes = []
-    spec.loader.exec_module(module)
-    if app_function_name:
-        app = load_fastapi_app(module, app_function_name)
-    else:
-        app = module.app
+    with timed(metrics, "module_load"):
+        if static:
+            # routes and sources come from the AST, the app is never imported
+            index = ProjectIndex(source_app_directory)
+            app_routes = index.routes(app_file_path, app_function_name, app_instance)
+            call_graph = CallGraph(
+                index.direct_function_calls,
+                models=ModelGraph(index.model_dependencies),
+            )
+        else:
+            module, spec = load_fastapi_module(app_file_path)
+            spec.loader.exec_module(module)
+            if app_function_name:
+                app = load_fastapi_app(module, app_function_name)
+            else:
+                app = getattr(module, app_instance)
+                # an explicit module:attr reference may point to an app factory
+                if not hasattr(app, "routes") and callable(app):
+                    app = app()
+            app_routes = app.routes
+            call_graph = CallGraph(
+                user_code=UserCode(
+                    source_app_directory, include_modules, exclude_modules
+                )
+            )
+        dependency_graph = DependencyGraph(call_graph)
 
     logger.info("Start generating tests")
 
     filtered_routes = [
         route
-        for route in app.routes
+        for route in app_routes
         if (
             (
                 function_name
@@ -244,74 +1399,75 @@ def walker(
         test_directory = Path(source_app_directory) / "tests"
         test_directory.mkdir()
 
-    for index, route in enumerate(filtered_routes):
-        logger.debug(f"{index}/{len(filtered_routes)}")
-
-        if test_directory.exists():
-            route_parts = route.path.strip("/").split("/")
-            method_suffix = "_".join(route.methods).upper()
-            directory = test_directory / Path(*route_parts)
-            if not directory.exists():
-                directory.mkdir(parents=True)
-
-            file_name = directory / f"test_{'_'.join(route_parts)}_{method_suffix}.py"
-
-        if file_name.exists() and not overwrite:
-            logger.info(f"Skipping test '{file_name}' already exists")
-            continue
+    if response_cache:
+        ai_client_plugin_instance = CachedAIClient(
+            ai_client_plugin_instance, response_cache
+        )
 
-        # 1. get all necessary codes, models, definitions
-        res = inspect_fastapi_route(route)
+    if batch and not hasattr(ai_client_plugin_instance, "submit_batch"):
+        if getattr(ai_client_plugin_instance, "isAsync", False):
+            raise Exception("The local batch stand-in needs a synchronous AI client")
+        logger.info("AI client has no batch API, using the local stand-in")
+        ai_client_plugin_instance = LocalBatchClient(
+            ai_client_plugin_instance, test_directory / ".fastapi_llm_test_batches"
+        )
 
-        # 2. extract necessary tables
-        if db_plugin_instance and db_plugin_instance.isAsync:
-            # TODO ehm this is not so good :(
-            res = asyncio.run(async_use_db_plugin(db_plugin_instance, res))
-        elif db_plugin_instance:
-            res = use_db_plugin(db_plugin_instance, res)
-        else:
-            logger.debug("Not using db_plugin")
+    manifest = None
+    if incremental:
+        manifest = Manifest(test_directory)
+        # the whole app, a filtered run keeps the entries of the other routes
+        manifest.prune(
+            {
+                route_definition(route)
+                for route in app_routes
+                if hasattr(route, "methods")
+            }
+        )
+    store = ContextStore()
 
-        # 4. create prompt
-        prompt = make_prompt(
-            additional_prompt_pre=additional_prompt_pre,
-            additional_prompt_info=additional_prompt_info,
-            mock_prompt=mock_prompt,
-            fixtures_prompt=fixtures_prompt,
-            url=route.path,
-            pydantic_prompt="".join(
-                [inspect.getsource(r) for r in res.pydantic_models if r]
-            )
-            if res.pydantic_models
-            else None,
-            function_prompt="".join(
-                [inspect.getsource(r) + "\n" for name, r in res.function_calls.items()]
+    try:
+        routes = asyncio.run(
+            generate_routes(
+                filtered_routes,
+                test_directory,
+                overwrite=overwrite,
+                concurrency=concurrency,
+                incremental=incremental,
+                manifest=manifest,
+                call_graph=call_graph,
+                dependency_graph=dependency_graph,
+                max_prompt_tokens=max_prompt_tokens,
+                batch=batch,
+                batch_poll_interval=batch_poll_interval,
+                stream=stream,
+                progress=progress,
+                db_plugin_instance=db_plugin_instance,
+                ai_client_plugin_instance=ai_client_plugin_instance,
+                additional_prompt_pre=additional_prompt_pre,
+                additional_prompt_info=additional_prompt_info,
+                mock_prompt=mock_prompt,
+                fixtures_prompt=fixtures_prompt,
+                additional_prompt_after=additional_prompt_after,
+                prompt_type=prompt_type,
+                run_tests=run_tests,
+                test_workers=test_workers,
+                stage_workers=stage_workers,
+                metrics=metrics,
+                group_by=group_by,
+                group_size=group_size,
+                store=store,
             )
-            if res.function_calls
-            else None,
-            db_prompt="\n".join(res.table_markdowns) + "\n"
-            if res.table_markdowns
-            else None,
-            code_prompt=res.source_code,
-            additional_prompt_after=additional_prompt_after,
-            prompt_type=prompt_type,
         )
+    finally:
+        if manifest is not None:
+            manifest.save()
+        logger.debug(f"Route context store: {store.stats()}")
+        if call_graph_dump:
+            call_graph.dump(call_graph_dump)
+        if metrics is not None:
+            metrics.finish()
 
-        logger.debug(prompt)
-        # 5. ask llm
-        response = ai_client_plugin_instance(prompt)
-
-        with open(file_name, "w") as f:
-            f.write(response.content)
-        logger.debug(f"Writing test to file: {file_name}")
-        # 6. potentially run tests
-
-        if run_tests:
-            run_test(file_name, prompt_type)
-
-        routes.append((res, response))
-
-    # except Exception as e:
-    #     print(f"Error loading FastAPI app: {e}")
+    if response_cache:
+        response_cache.evict()
 
     return routes